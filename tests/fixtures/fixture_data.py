@@ -9,6 +9,8 @@ from posts.models import Post, Group
 def mock_media(settings):
     with tempfile.TemporaryDirectory() as temp_directory:
         settings.MEDIA_ROOT = temp_directory
+        # Фоновые миниатюры могли бы записаться уже после удаления папки.
+        settings.THUMBNAIL_ASYNC = False
         yield temp_directory
 
 
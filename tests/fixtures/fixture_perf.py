@@ -0,0 +1,107 @@
+import json
+import os
+import random
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from faker import Faker
+from mixer.backend.django import mixer as _mixer
+from posts.models import Comment, Follow, Group, Post
+
+# Полный объем: YATUBE_PERF_SCALE=1. По умолчанию берется сотая часть,
+# чтобы набор успевал собраться при каждом запуске тестов.
+PERF_SCALE = float(os.getenv('YATUBE_PERF_SCALE', '0.01'))
+PERF_REPORT = os.getenv(
+    'YATUBE_PERF_REPORT',
+    os.path.join(os.path.dirname(settings.BASE_DIR), 'perf_report.json'),
+)
+FULL_VOLUME = {
+    'users': 10_000,
+    'groups': 100,
+    'posts': 100_000,
+    'follows_per_user': 50,
+    'comments': 100_000,
+    'hot_post_comments': 1_000,
+}
+
+
+def scaled(name):
+    return max(2, int(FULL_VOLUME[name] * PERF_SCALE))
+
+
+@pytest.fixture(scope='module')
+def perf_data(django_db_setup, django_db_blocker):
+    """Наполняет базу объемом, близким к боевому, и очищает ее после модуля."""
+    fake = Faker('ru_RU')
+    rnd = random.Random(2022)
+    with django_db_blocker.unblock():
+        users = _mixer.cycle(scaled('users')).blend(
+            settings.AUTH_USER_MODEL,
+            username=(f'perf_user_{i}' for i in range(scaled('users'))),
+        )
+        groups = _mixer.cycle(scaled('groups')).blend(
+            Group, slug=(f'perf-group-{i}' for i in range(scaled('groups')))
+        )
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text=fake.text(max_nb_chars=300),
+                    author=rnd.choice(users),
+                    group=rnd.choice(groups + [None]),
+                )
+                for _ in range(scaled('posts'))
+            ),
+        )
+        follows_per_user = min(scaled('follows_per_user'), len(users) - 1)
+        Follow.objects.bulk_create(
+            (
+                Follow(user=user, author=author)
+                for user in users
+                for author in rnd.sample(users, follows_per_user)
+                if author != user
+            ),
+            ignore_conflicts=True,
+        )
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        hot_post = Post.objects.get(pk=post_ids[0])
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post_id=rnd.choice(post_ids),
+                    author=rnd.choice(users),
+                    text=fake.sentence(),
+                )
+                for _ in range(scaled('comments'))
+            ),
+        )
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post=hot_post, author=rnd.choice(users), text=fake.sentence()
+                )
+                for _ in range(scaled('hot_post_comments'))
+            ),
+        )
+        # bulk_create не вызывает сигналы: производные данные пересчитываются.
+        call_command('reconcile_counters', stdout=StringIO())
+        if settings.FOLLOW_TIMELINE:
+            call_command('rebuild_timelines', stdout=StringIO())
+        yield {
+            'users': users,
+            'groups': groups,
+            'post_ids': post_ids,
+            'hot_post': hot_post,
+            'random': rnd,
+        }
+        call_command('flush', interactive=False, verbosity=0)
+
+
+@pytest.fixture(scope='module')
+def perf_report():
+    """Собирает результаты замеров и сохраняет их в JSON."""
+    report = {'scale': PERF_SCALE, 'volume': {}, 'views': {}}
+    yield report
+    with open(PERF_REPORT, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
@@ -0,0 +1,204 @@
+import os
+import random
+import time
+import tracemalloc
+
+import pytest
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+
+from core.loadtest import percentile
+from posts.recommendations import Graph, recommend, similar_authors
+from posts.utils import get_page
+from tests.fixtures.fixture_perf import FULL_VOLUME, PERF_SCALE, scaled
+
+pytestmark = [pytest.mark.django_db]
+
+REQUESTS_PER_VIEW = int(os.getenv('YATUBE_PERF_REQUESTS', '20'))
+# Бюджет запросов к базе для авторизованного пользователя без кэша:
+# сессия и пользователь занимают два запроса, в профиле и подписках еще
+# один читает рекомендации авторов.
+QUERY_BUDGETS = {
+    'index': 4,
+    'group_posts': 5,
+    'profile': 7,
+    'post_detail': 5,
+    'follow_index': 5,
+    'add_comment': 5,
+}
+P95_BUDGET_MS = float(os.getenv('YATUBE_PERF_P95_MS', '500'))
+# Время и пик памяти зависят от машины и версии Python, поэтому их бюджеты
+# проверяются только по запросу, в отчет замеры попадают всегда.
+ASSERT_TIME = os.getenv('YATUBE_PERF_ASSERT_TIME', '') == '1'
+
+
+def index_requests(data):
+    return [('get', '/', {}), ('get', '/?page=2', {})]
+
+
+def group_posts_requests(data):
+    return [('get', f'/group/{group.slug}/', {}) for group in data['groups']]
+
+
+def profile_requests(data):
+    return [('get', f'/profile/{user.username}/', {}) for user in data['users']]
+
+
+def post_detail_requests(data):
+    hot_post = data['hot_post']
+    return [('get', f'/posts/{hot_post.pk}/', {})] + [
+        ('get', f'/posts/{post_id}/', {}) for post_id in data['post_ids']
+    ]
+
+
+def follow_index_requests(data):
+    return [('get', '/follow/', {}), ('get', '/follow/?page=2', {})]
+
+
+def add_comment_requests(data):
+    return [
+        ('post', f'/posts/{post_id}/comment/', {'text': 'Нагрузочный комментарий'})
+        for post_id in data['post_ids']
+    ]
+
+
+VIEWS = {
+    'index': index_requests,
+    'group_posts': group_posts_requests,
+    'profile': profile_requests,
+    'post_detail': post_detail_requests,
+    'follow_index': follow_index_requests,
+    'add_comment': add_comment_requests,
+}
+
+
+class TestPerformanceBudget:
+
+    @pytest.mark.parametrize('view_name', VIEWS)
+    def test_view_budget(self, view_name, perf_data, perf_report, client):
+        perf_report['volume'] = {name: scaled(name) for name in FULL_VOLUME}
+        client.force_login(perf_data['users'][0])
+        candidates = VIEWS[view_name](perf_data)
+        requests = [candidates[0]] + perf_data['random'].choices(
+            candidates, k=REQUESTS_PER_VIEW - 1
+        )
+        timings, queries = [], []
+        for method, url, payload in requests:
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, payload)
+                timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code in (200, 302), (
+                f'`{url}` вернул код {response.status_code}'
+            )
+            queries.append(len(captured))
+
+        result = {
+            'requests': len(requests),
+            'max_queries': max(queries),
+            'query_budget': QUERY_BUDGETS[view_name],
+            'p50_ms': round(percentile(sorted(timings), 0.5), 2),
+            'p95_ms': round(percentile(sorted(timings), 0.95), 2),
+            'p95_budget_ms': P95_BUDGET_MS,
+        }
+        perf_report['views'][view_name] = result
+        assert result['max_queries'] <= QUERY_BUDGETS[view_name], (
+            f'`{view_name}` выполняет {result["max_queries"]} запросов '
+            f'при бюджете {QUERY_BUDGETS[view_name]}'
+        )
+        if ASSERT_TIME:
+            assert result['p95_ms'] <= P95_BUDGET_MS, (
+                f'p95 `{view_name}` {result["p95_ms"]} мс '
+                f'при бюджете {P95_BUDGET_MS} мс'
+            )
+
+
+class TestPaginatorRender:
+
+    PAGE_COUNTS = (100, 10_000, 1_000_000)
+    RENDERS = 50
+
+    def render(self, num_pages):
+        paginator = Paginator(range(num_pages * 10), 10)
+        context = {'page_obj': get_page(paginator, num_pages // 2)}
+        timings = []
+        for _ in range(self.RENDERS):
+            started = time.perf_counter()
+            html = render_to_string('posts/includes/paginator.html', context)
+            timings.append((time.perf_counter() - started) * 1000)
+        return percentile(sorted(timings), 0.5), len(html)
+
+    def test_render_cost_independent_of_page_count(self, perf_report):
+        self.render(self.PAGE_COUNTS[0])
+        results = {
+            num_pages: self.render(num_pages) for num_pages in self.PAGE_COUNTS
+        }
+        perf_report['paginator'] = {
+            num_pages: {'p50_ms': round(ms, 3), 'bytes': size}
+            for num_pages, (ms, size) in results.items()
+        }
+        (small_ms, small_size), *_, (large_ms, large_size) = results.values()
+        # Номера страниц становятся длиннее, но ссылок столько же.
+        assert large_size < small_size * 1.2, (
+            f'Навигация по {self.PAGE_COUNTS[-1]} страницам занимает '
+            f'{large_size} байт против {small_size}'
+        )
+        if ASSERT_TIME:
+            assert large_ms < small_ms * 3 + 0.5, (
+                f'Навигация по {self.PAGE_COUNTS[-1]} страницам рисуется '
+                f'{large_ms:.3f} мс против {small_ms:.3f}'
+            )
+
+
+class TestRecommendationsBatch:
+
+    FULL_EDGES = 10_000_000
+    # Пересчет полного графа должен укладываться в минуты.
+    FULL_BUDGET_S = 600
+    BYTES_PER_EDGE = 32
+    FANOUT = 30
+
+    def graph(self, users, edges):
+        rnd = random.Random(0)
+        follows = set()
+        while len(follows) < edges:
+            # Популярность авторов распределена с тяжелым хвостом.
+            user, author = rnd.randrange(users), int(users ** rnd.random())
+            if user != author:
+                follows.add((user, author))
+        return Graph.from_edges(sorted(follows), size=users)
+
+    def recommend_all(self, graph):
+        similar = similar_authors(graph, self.FANOUT)
+        for user_id in range(graph.size):
+            recommend(user_id, graph, similar, self.FANOUT, 5)
+
+    def test_batch_linear_in_edges(self, perf_report):
+        edges = max(10_000, int(self.FULL_EDGES * PERF_SCALE))
+        graph = self.graph(edges // 10, edges)
+        started = time.perf_counter()
+        self.recommend_all(graph)
+        seconds = time.perf_counter() - started
+        tracemalloc.start()
+        self.recommend_all(graph)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        projected = seconds * self.FULL_EDGES / edges
+        perf_report['recommendations'] = {
+            'edges': edges,
+            'seconds': round(seconds, 2),
+            'projected_full_s': round(projected),
+            'peak_bytes_per_edge': round(peak / edges, 1),
+        }
+        if ASSERT_TIME:
+            assert projected <= self.FULL_BUDGET_S, (
+                f'Рекомендации для {self.FULL_EDGES} подписок займут '
+                f'~{projected:.0f} с при бюджете {self.FULL_BUDGET_S} с'
+            )
+            assert peak <= edges * self.BYTES_PER_EDGE, (
+                f'Пересчет занимает {peak / edges:.1f} байт на подписку'
+            )
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import db
+
+        connection_created.connect(
+            db.apply_pragmas, dispatch_uid="core.db.apply_pragmas"
+        )
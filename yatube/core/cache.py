@@ -0,0 +1,150 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import stats
+
+
+class TwoTierCache(BaseCache):
+    """
+    Небольшой LRU-кэш процесса перед общим кэшем из CACHES.
+
+    LOCATION — имя общего кэша. Чтение сначала идет в локальный кэш, где
+    значения живут не дольше NEAR_TIMEOUT секунд; запись, удаление и
+    счетчики сразу уходят в общий кэш. Свежесть страниц между процессами
+    обеспечивают версии в общем кэше (см. posts.caching).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._shared_alias = location
+        self.near_timeout = float(options.get("NEAR_TIMEOUT", 5))
+        self.near_max_entries = int(options.get("NEAR_MAX_ENTRIES", 1000))
+        self._near = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    @staticmethod
+    def _count(near_hits=0, shared_hits=0, misses=0):
+        # Счетчики core.stats: cache.hit и cache.miss, попадания в кэш
+        # процесса отдельно в cache.near_hit.
+        if near_hits:
+            stats.incr("cache.near_hit", near_hits)
+        if near_hits or shared_hits:
+            stats.incr("cache.hit", near_hits + shared_hits)
+        if misses:
+            stats.incr("cache.miss", misses)
+
+    def _near_get(self, key):
+        with self._lock:
+            entry = self._near.get(key)
+            if entry is None:
+                return None
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self._near[key]
+                return None
+            self._near.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _near_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        lifetime = self.near_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            lifetime = min(lifetime, timeout)
+        if lifetime <= 0:
+            self._near_delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._near[key] = (time.monotonic() + lifetime, pickled)
+            self._near.move_to_end(key)
+            while len(self._near) > self.near_max_entries:
+                self._near.popitem(last=False)
+
+    def _near_delete(self, key):
+        with self._lock:
+            self._near.pop(key, None)
+
+    def get(self, key, default=None, version=None):
+        near_key = self.make_key(key, version)
+        value = self._near_get(near_key)
+        if value is not None:
+            self._count(near_hits=1)
+            return value
+        value = self.shared.get(key, version=version)
+        if value is None:
+            self._count(misses=1)
+            return default
+        self._count(shared_hits=1)
+        self._near_set(near_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._near_get(self.make_key(key, version))
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        near_hits = len(found)
+        shared_found = {}
+        if missing:
+            shared_found = self.shared.get_many(missing, version=version)
+            for key, value in shared_found.items():
+                self._near_set(self.make_key(key, version), value)
+            found.update(shared_found)
+        self._count(
+            near_hits, len(shared_found), len(missing) - len(shared_found)
+        )
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._near_set(self.make_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._near_set(self.make_key(key, version), value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Блокировки и счетчики решает только общий кэш.
+        added = self.shared.add(key, value, timeout, version=version)
+        self._near_delete(self.make_key(key, version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._near_delete(self.make_key(key, version))
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._near_delete(self.make_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._near_delete(self.make_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def clear(self):
+        with self._lock:
+            self._near.clear()
+        self.shared.clear()
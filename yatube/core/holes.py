@@ -0,0 +1,82 @@
+"""
+Персональные фрагменты («дыры») в страницах, общих для всех
+пользователей.
+
+Тег {% hole "имя" ключ=значение %} обычно сразу выводит фрагмент
+зарегистрированной функции. Пока страница рисуется для общего кэша
+(collect), вместо фрагмента ставится маркер, а имя и аргументы
+запоминаются; fill() затем подставляет фрагменты для конкретного
+пользователя. Маркер содержит случайный токен страницы, поэтому его
+нельзя подделать текстом поста.
+"""
+import re
+import secrets
+import threading
+from contextlib import contextmanager
+
+from django.template.loader import render_to_string
+
+_renderers = {}
+_state = threading.local()
+
+
+def register(name):
+    """Регистрирует функцию (request, **kwargs) -> html для дыры name."""
+
+    def decorator(func):
+        _renderers[name] = func
+        return func
+
+    return decorator
+
+
+def register_template(name, template):
+    """Дыра name, которая рисует template с аргументами в контексте."""
+
+    @register(name)
+    def render(request, **kwargs):
+        return render_to_string(template, kwargs, request=request)
+
+    return render
+
+
+def render(request, name, kwargs):
+    return _renderers[name](request, **kwargs)
+
+
+@contextmanager
+def collect():
+    """
+    Собирает дыры страниц, нарисованных внутри блока.
+
+    Выдает словарь с токеном маркеров и списком (имя, аргументы).
+    """
+    punched = {"token": secrets.token_hex(8), "holes": []}
+    previous = getattr(_state, "punched", None)
+    _state.punched = punched
+    try:
+        yield punched
+    finally:
+        _state.punched = previous
+
+
+def punch(request, name, kwargs):
+    """Маркер дыры внутри collect(), иначе готовый фрагмент."""
+    punched = getattr(_state, "punched", None)
+    if punched is None:
+        return render(request, name, kwargs)
+    punched["holes"].append((name, kwargs))
+    return f"<!--hole:{punched['token']}:{len(punched['holes']) - 1}-->"
+
+
+def fill(request, content, token, holes):
+    """Подставляет в content фрагменты дыр для пользователя request."""
+    if not holes:
+        return content
+    marker = re.compile(rf"<!--hole:{token}:(\d+)-->")
+    return marker.sub(
+        lambda match: render(request, *holes[int(match.group(1))]), content
+    )
+
+
+register_template("header_user", "includes/header_user.html")
@@ -0,0 +1,290 @@
+"""
+Нагрузочный тест сайта по HTTP.
+
+Виртуальные пользователи в отдельных потоках выполняют действия сценария
+со случайными весами и замеряют время ответа каждого маршрута.
+
+Сценарий — JSON вида:
+
+    {
+        "users": 20,
+        "duration": 30,
+        "authenticated_share": 0.5,
+        "password": "password",
+        "think_time": 0,
+        "actions": [
+            {"route": "posts:index", "weight": 30,
+             "pages": {"1": 80, "2": 15, "10": 5}},
+            {"route": "posts:profile", "weight": 10,
+             "kwargs": {"username": "$username"}},
+            {"route": "posts:add_comment", "weight": 2, "method": "post",
+             "auth": true, "kwargs": {"post_id": "$post"},
+             "data": {"text": "Комментарий"}}
+        ]
+    }
+
+Значения kwargs вида "$username", "$group" и "$post" подставляются из
+случайной выборки записей базы; params добавляются к строке запроса,
+pages задает веса номеров страниц.
+Действия с "auth": true выполняют только вошедшие пользователи.
+"""
+import json
+import random
+import threading
+import time
+
+import requests
+from django.urls import reverse
+from posts.models import Group, Post, User
+
+DEFAULT_SCENARIO = {
+    "users": 10,
+    "duration": 30,
+    "authenticated_share": 0.5,
+    "password": "password",
+    "think_time": 0,
+    "actions": [],
+}
+PERCENTILES = (50, 95, 99)
+TIMEOUT = 30
+
+
+def load_scenario(path):
+    with open(path, encoding="utf-8") as file:
+        scenario = dict(DEFAULT_SCENARIO, **json.load(file))
+    if not scenario["actions"]:
+        raise ValueError("В сценарии нет действий.")
+    for action in scenario["actions"]:
+        # Маршрут проверяется сразу, а не в потоках во время теста.
+        reverse(action["route"], kwargs=_placeholders(action))
+    return scenario
+
+
+def _placeholders(action):
+    # Для проверки маршрута подставляются правдоподобные значения.
+    samples = {"$username": "user", "$group": "group", "$post": 1}
+    return {
+        name: samples.get(value, value)
+        for name, value in action.get("kwargs", {}).items()
+    }
+
+
+def usable_actions(scenario, data):
+    """Действия, для подстановок которых в выборке есть записи."""
+    return [
+        action
+        for action in scenario["actions"]
+        if all(
+            data.get(value[1:])
+            for value in action.get("kwargs", {}).values()
+            if isinstance(value, str) and value.startswith("$")
+        )
+    ]
+
+
+def sample_data(size):
+    """Случайные имена пользователей, слаги групп и id постов из базы."""
+    return {
+        "username": list(
+            User.objects.order_by("?").values_list("username", flat=True)[
+                :size
+            ]
+        ),
+        "group": list(
+            Group.objects.order_by("?").values_list("slug", flat=True)[:size]
+        ),
+        "post": list(
+            Post.objects.order_by("?").values_list("pk", flat=True)[:size]
+        ),
+    }
+
+
+def percentile(values, share):
+    """Значение, которого не превышает доля share отсортированных values."""
+    if not values:
+        return None
+    index = min(len(values) - 1, int(len(values) * share))
+    return values[index]
+
+
+class VirtualUser:
+    """Сессия одного пользователя: вход и цикл действий до deadline."""
+
+    def __init__(self, base_url, scenario, data, seed, record):
+        self.base_url = base_url.rstrip("/")
+        self.scenario = scenario
+        self.data = data
+        self.random = random.Random(seed)
+        self.record = record
+        self.session = requests.Session()
+        self.authenticated = False
+
+    def request(self, name, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                self.base_url + path,
+                allow_redirects=False,
+                timeout=TIMEOUT,
+                **kwargs,
+            )
+        except requests.RequestException:
+            self.record(name, time.perf_counter() - started, None)
+            return None
+        self.record(name, time.perf_counter() - started, response.status_code)
+        return response
+
+    def _csrf(self):
+        return self.session.cookies.get("csrftoken", "")
+
+    def login(self):
+        path = reverse("users:login")
+        # Первый запрос выдает cookie csrftoken для формы входа.
+        self.request("users:login", "get", path)
+        response = self.request(
+            "users:login",
+            "post",
+            path,
+            data={
+                "username": self.random.choice(self.data["username"]),
+                "password": self.scenario["password"],
+                "csrfmiddlewaretoken": self._csrf(),
+            },
+        )
+        # Успешный вход перенаправляет, ошибка возвращает форму.
+        self.authenticated = response is not None and response.is_redirect
+
+    def _value(self, value):
+        if isinstance(value, str) and value.startswith("$"):
+            return self.random.choice(self.data[value[1:]])
+        return value
+
+    def act(self, action):
+        kwargs = {
+            name: self._value(value)
+            for name, value in action.get("kwargs", {}).items()
+        }
+        path = reverse(action["route"], kwargs=kwargs)
+        method = action.get("method", "get")
+        options = {"params": dict(action.get("params", {}))}
+        if action.get("pages"):
+            pages = action["pages"]
+            options["params"]["page"] = self.random.choices(
+                list(pages), list(pages.values())
+            )[0]
+        if method == "post":
+            options["data"] = dict(
+                action.get("data", {}), csrfmiddlewaretoken=self._csrf()
+            )
+        self.request(action["route"], method, path, **options)
+
+    def run(self, deadline):
+        if (
+            self.data["username"]
+            and self.random.random() < self.scenario["authenticated_share"]
+        ):
+            self.login()
+        actions = [
+            action
+            for action in usable_actions(self.scenario, self.data)
+            if self.authenticated or not action.get("auth")
+        ]
+        if not actions:
+            return
+        weights = [action.get("weight", 1) for action in actions]
+        while time.monotonic() < deadline:
+            self.act(self.random.choices(actions, weights)[0])
+            if self.scenario["think_time"]:
+                time.sleep(
+                    self.random.expovariate(1 / self.scenario["think_time"])
+                )
+
+
+def run(base_url, scenario, data, seed=None):
+    """
+    Выполняет сценарий и возвращает отчет.
+
+    Отчет — словарь с длительностью теста, итогом total и маршрутами
+    routes: число запросов, RPS, доля ошибок и перцентили времени
+    ответа в миллисекундах.
+    """
+    samples, lock = {}, threading.Lock()
+
+    def record(name, seconds, status):
+        # Ошибки — нет ответа, 4xx и 5xx; перенаправления считаются успехом.
+        error = status is None or status >= 400
+        with lock:
+            samples.setdefault(name, []).append((seconds, error))
+
+    rnd = random.Random(seed)
+    users = [
+        VirtualUser(base_url, scenario, data, rnd.random(), record)
+        for _ in range(scenario["users"])
+    ]
+    started = time.monotonic()
+    deadline = started + scenario["duration"]
+    threads = [
+        threading.Thread(target=user.run, args=(deadline,)) for user in users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.monotonic() - started
+    routes = {
+        name: _summary(values, duration) for name, values in samples.items()
+    }
+    all_samples = [value for values in samples.values() for value in values]
+    return {
+        "duration": duration,
+        "users": scenario["users"],
+        "total": _summary(all_samples, duration),
+        "routes": dict(sorted(routes.items())),
+    }
+
+
+def _summary(values, duration):
+    timings = sorted(seconds * 1000 for seconds, _ in values)
+    errors = sum(error for _, error in values)
+    summary = {
+        "requests": len(values),
+        "rps": len(values) / duration,
+        "error_rate": errors / len(values) if values else 0,
+    }
+    for share in PERCENTILES:
+        summary[f"p{share}_ms"] = percentile(timings, share / 100)
+    return summary
+
+
+def compare(report, baseline, threshold):
+    """
+    Ухудшения относительно baseline больше доли threshold.
+
+    Возвращает список строк: падение RPS, рост p95 и рост доли ошибок
+    по маршрутам, которые есть в обоих отчетах.
+    """
+    regressions = []
+    for name, current in report["routes"].items():
+        previous = baseline["routes"].get(name)
+        if previous is None:
+            continue
+        if current["rps"] < previous["rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: RPS {previous['rps']:.1f} → {current['rps']:.1f}"
+            )
+        if (
+            current["p95_ms"] is not None
+            and previous["p95_ms"] is not None
+            and current["p95_ms"] > previous["p95_ms"] * (1 + threshold)
+        ):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']:.1f} → "
+                f"{current['p95_ms']:.1f} мс"
+            )
+        if current["error_rate"] > previous["error_rate"] + threshold:
+            regressions.append(
+                f"{name}: ошибки {previous['error_rate']:.1%} → "
+                f"{current['error_rate']:.1%}"
+            )
+    return regressions
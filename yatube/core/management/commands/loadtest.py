@@ -0,0 +1,115 @@
+import json
+import os
+
+from core import loadtest
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import NoReverseMatch
+
+DEFAULT_SCENARIO = os.path.join(
+    os.path.dirname(loadtest.__file__), "scenarios", "default.json"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест запущенного сайта по HTTP: RPS, p50/p95/p99 и "
+        "доля ошибок по маршрутам, сравнение с прошлым прогоном."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            default="http://127.0.0.1:8000",
+            help="Адрес запущенного сайта.",
+        )
+        parser.add_argument(
+            "--scenario",
+            default=DEFAULT_SCENARIO,
+            help="JSON-файл сценария (формат описан в core.loadtest).",
+        )
+        parser.add_argument(
+            "--users", type=int, help="Переопределить число пользователей."
+        )
+        parser.add_argument(
+            "--duration", type=float, help="Переопределить длительность, с."
+        )
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=1000,
+            help="Сколько пользователей, групп и постов взять из базы.",
+        )
+        parser.add_argument("--seed", type=int, help="Seed выбора действий.")
+        parser.add_argument(
+            "--output",
+            default="loadtest_report.json",
+            help="Куда сохранить отчет.",
+        )
+        parser.add_argument(
+            "--baseline", help="Отчет прошлого прогона для сравнения."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.1,
+            help="Допустимое ухудшение относительно baseline, доля.",
+        )
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{'Маршрут':<28}{'запросов':>9}{'RPS':>8}{'p50':>8}"
+            f"{'p95':>8}{'p99':>8}{'ошибки':>8}"
+        )
+        for name, route in [
+            *report["routes"].items(),
+            ("total", report["total"]),
+        ]:
+            self.stdout.write(
+                f"{name:<28}{route['requests']:>9}{route['rps']:>8.1f}"
+                + "".join(
+                    f"{route[f'p{share}_ms'] or 0:>8.1f}"
+                    for share in loadtest.PERCENTILES
+                )
+                + f"{route['error_rate']:>8.1%}"
+            )
+
+    def handle(self, *args, **options):
+        try:
+            scenario = loadtest.load_scenario(options["scenario"])
+        except (OSError, ValueError, KeyError, NoReverseMatch) as error:
+            raise CommandError(f"Ошибка в сценарии: {error}") from error
+        for name in ("users", "duration"):
+            if options[name] is not None:
+                scenario[name] = options[name]
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)
+
+        data = loadtest.sample_data(options["sample"])
+        skipped = [
+            action["route"]
+            for action in scenario["actions"]
+            if action not in loadtest.usable_actions(scenario, data)
+        ]
+        if skipped:
+            self.stderr.write(
+                f"Нет записей для действий: {', '.join(skipped)}"
+            )
+        report = loadtest.run(options["url"], scenario, data, options["seed"])
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+        self.print_report(report)
+        self.stdout.write(f"Отчет сохранен в {options['output']}")
+        if baseline is None:
+            return
+        regressions = loadtest.compare(report, baseline, options["threshold"])
+        for regression in regressions:
+            self.stderr.write(regression)
+        if regressions:
+            raise CommandError(
+                f"Ухудшений относительно {options['baseline']}: "
+                f"{len(regressions)}"
+            )
+        self.stdout.write(self.style.SUCCESS("Ухудшений нет."))
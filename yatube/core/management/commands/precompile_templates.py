@@ -0,0 +1,43 @@
+from core.precompile import include_chains, precompile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Компилирует и проверяет все шаблоны проекта, выводит время "
+        "компиляции и глубину вложенности extends/include."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--slowest",
+            type=int,
+            default=5,
+            help="Сколько самых медленных шаблонов вывести.",
+        )
+
+    def handle(self, *args, **options):
+        compiled, timings, errors = precompile()
+        for name, error in errors.items():
+            self.stderr.write(f"{name}: {error}")
+        total = sum(timings.values()) * 1000
+        self.stdout.write(
+            f"Скомпилировано шаблонов: {len(compiled)} за {total:.1f} мс"
+            + ("" if settings.CACHED_TEMPLATES else " (без кэша шаблонов)")
+        )
+        slowest = sorted(timings, key=timings.get, reverse=True)
+        for name in slowest[: options["slowest"]]:
+            self.stdout.write(f"  {name}: {timings[name] * 1000:.1f} мс")
+
+        self.stdout.write("Глубина вложенности:")
+        chains = include_chains(compiled)
+        for name in sorted(
+            chains, key=lambda name: (-len(chains[name]), name)
+        ):
+            if len(chains[name]) > 1:
+                self.stdout.write(
+                    f"  {len(chains[name]) - 1} {' → '.join(chains[name])}"
+                )
+        if errors:
+            raise CommandError(f"Шаблонов с ошибками: {len(errors)}")
@@ -0,0 +1,40 @@
+import sqlite3
+import time
+
+from core import replicas
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу SQLite в реплики REPLICA_DATABASES — "
+        "замена репликации для локальной проверки чтения с реплик."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Повторять копирование каждые N секунд до прерывания.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError(
+                "Реплики не настроены: задайте пути в YATUBE_REPLICAS."
+            )
+        while True:
+            for alias in settings.REPLICA_DATABASES:
+                started = time.perf_counter()
+                try:
+                    replicas.sync(alias)
+                except (OSError, ValueError, sqlite3.Error) as error:
+                    raise CommandError(f"{alias}: {error}")
+                if options["verbosity"] > 1:
+                    seconds = time.perf_counter() - started
+                    self.stdout.write(f"{alias}: {seconds * 1000:.1f} мс")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+from . import replicas, stats
+
+# Последние замеры запросов, новые в конце.
+profiles = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+
+_template_state = threading.local()
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    # Включенные шаблоны отрисовываются внутри внешнего: время считается
+    # только для самого внешнего шаблона.
+    if not getattr(_template_state, "active", False):
+        return _original_render(self, context)
+    depth = getattr(_template_state, "depth", 0)
+    _template_state.depth = depth + 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        _template_state.depth = depth
+        if depth == 0:
+            _template_state.seconds += time.perf_counter() - started
+
+
+class QueryRecorder:
+    """Обертка execute_wrapper: время и текст каждого SQL-запроса."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, repr(params), time.perf_counter() - started)
+            )
+
+    def duplicates(self):
+        """Повторы одинаковых запросов с одинаковыми параметрами."""
+        counts = Counter((sql, params) for sql, params, _ in self.queries)
+        return {sql: count for (sql, _), count in counts.items() if count > 1}
+
+
+class ProfilingMiddleware:
+    """
+    Замеряет долю запросов PROFILING_SAMPLE_RATE: общее время, число и
+    время SQL-запросов, повторы запросов, время отрисовки шаблонов и
+    обращения к кэшу.
+
+    Замеры попадают в кольцевой буфер profiles (страница
+    /admin/profiling/) и в заголовок Server-Timing. При нулевой доле
+    middleware отключается целиком.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        Template.render = _timed_render
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        _template_state.active = True
+        _template_state.seconds = 0
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack, stats.collect() as counters:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            _template_state.active = False
+        total = time.perf_counter() - started
+        profile = self.profile(request, response, total, recorder, counters)
+        profiles.append(profile)
+        response["Server-Timing"] = self.server_timing(profile)
+        return response
+
+    @staticmethod
+    def profile(request, response, total, recorder, counters):
+        duplicates = recorder.duplicates()
+        return {
+            "time": datetime.now(),
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": getattr(request.resolver_match, "view_name", None),
+            "status": response.status_code,
+            "total_ms": total * 1000,
+            "sql_count": len(recorder.queries),
+            "sql_ms": sum(seconds for *_, seconds in recorder.queries) * 1000,
+            "duplicate_count": sum(duplicates.values()) - len(duplicates),
+            "duplicates": duplicates,
+            "template_ms": _template_state.seconds * 1000,
+            "cache_hits": counters["cache.hit"],
+            "cache_misses": counters["cache.miss"],
+        }
+
+    @staticmethod
+    def server_timing(profile):
+        return ", ".join(
+            (
+                f'total;dur={profile["total_ms"]:.1f}',
+                f'sql;dur={profile["sql_ms"]:.1f};'
+                f'desc="{profile["sql_count"]} queries, '
+                f'{profile["duplicate_count"]} duplicates"',
+                f'tpl;dur={profile["template_ms"]:.1f}',
+                f'cache;desc="{profile["cache_hits"]} hits, '
+                f'{profile["cache_misses"]} misses"',
+            )
+        )
+
+
+class StickyPrimaryMiddleware:
+    """
+    После запроса на запись закрепляет клиента за основной базой, чтобы
+    он сразу видел свои изменения, а не отстающую реплику
+    (core.replicas). Без реплик middleware отключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in ("GET", "HEAD", "OPTIONS", "TRACE")
+            and response.status_code < 400
+        ):
+            replicas.stick(response)
+        return response
@@ -0,0 +1,73 @@
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.loader_tags import ExtendsNode, IncludeNode
+
+
+def template_names():
+    """Имена всех шаблонов из каталогов TEMPLATES["DIRS"]."""
+    names = []
+    for directory in settings.TEMPLATES[0]["DIRS"]:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith((".html", ".txt")):
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, directory)
+                    names.append(name.replace(os.sep, "/"))
+    return sorted(names)
+
+
+def precompile(names=None):
+    """
+    Компилирует шаблоны и с кэширующим загрузчиком оставляет их в памяти.
+
+    Возвращает словари {имя: шаблон}, {имя: время в секундах} и
+    {имя: ошибка} для шаблонов, которые не удалось разобрать.
+    """
+    engine = engines["django"].engine
+    compiled, timings, errors = {}, {}, {}
+    for name in template_names() if names is None else names:
+        started = time.perf_counter()
+        try:
+            compiled[name] = engine.get_template(name)
+        except TemplateSyntaxError as error:
+            errors[name] = error
+        timings[name] = time.perf_counter() - started
+    return compiled, timings, errors
+
+
+def _dependencies(template):
+    """Имена шаблонов, которые template расширяет или включает."""
+    nodes = template.nodelist.get_nodes_by_type(ExtendsNode)
+    names = [node.parent_name.var for node in nodes]
+    nodes = template.nodelist.get_nodes_by_type(IncludeNode)
+    names += [node.template.var for node in nodes]
+    # Имена из переменных известны только при отрисовке.
+    return [name for name in names if isinstance(name, str)]
+
+
+def include_chains(compiled):
+    """
+    Самая длинная цепочка extends/include для каждого шаблона.
+
+    Возвращает {имя: [имя, шаблон-родитель или включение, ...]}.
+    """
+    chains = {}
+
+    def chain(name, seen):
+        if name in chains:
+            return chains[name]
+        longest = []
+        for child in _dependencies(compiled[name]):
+            if child in compiled and child not in seen:
+                candidate = chain(child, seen | {child})
+                if len(candidate) > len(longest):
+                    longest = candidate
+        chains[name] = [name] + longest
+        return chains[name]
+
+    for name in compiled:
+        chain(name, {name})
+    return chains
@@ -0,0 +1,166 @@
+"""
+Чтение лент с реплик базы.
+
+Представления с декоратором replica_reads читают модели приложений
+REPLICA_APPS с одной из реплик REPLICA_DATABASES, запись всегда идет в
+основную базу. Реплика годится для запроса, если ее снимок не старше
+данных, которые запрос уже видел: require() поднимает нижнюю границу,
+например, до версии кэша лент. Позицию каждой реплики — время снимка в
+миллисекундах — публикует шаг репликации (sync_replicas).
+
+После запроса на запись пользователь REPLICA_STICKY_SECONDS секунд
+читает только основную базу (cookie от StickyPrimaryMiddleware), чтобы
+сразу видеть свои изменения.
+"""
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+STICKY_COOKIE = "primary_until"
+POSITION_PREFIX = "replica_position"
+
+
+class _State(threading.local):
+    active = False
+    # Позиции реплик на начало запроса и нижняя граница свежести.
+    positions = {}
+    floor = 0
+    alias = None
+
+
+_state = _State()
+
+
+def _positions_cache():
+    # Как и версии лент, позиции должны одинаково видеть все процессы.
+    return getattr(cache, "shared", cache)
+
+
+def _position_key(alias):
+    return f"{POSITION_PREFIX}:{alias}"
+
+
+def positions():
+    """{псевдоним реплики: время снимка в мс} для известных реплик."""
+    keys = {
+        _position_key(alias): alias for alias in settings.REPLICA_DATABASES
+    }
+    found = _positions_cache().get_many(list(keys))
+    return {keys[key]: position for key, position in found.items()}
+
+
+def sync(alias):
+    """
+    Копирует основную базу SQLite в реплику alias и публикует ее позицию.
+
+    Замена настоящей репликации для локальной проверки: снимок делается
+    через backup API SQLite и согласован даже при одновременной записи.
+    """
+    source = connections["default"]
+    if source.vendor != "sqlite":
+        raise ValueError("Копировать можно только базу SQLite.")
+    # Позиция берется до начала копирования: все, что записано раньше,
+    # попадет в снимок.
+    position = int(time.time() * 1000)
+    source.ensure_connection()
+    target = sqlite3.connect(connections.databases[alias]["NAME"])
+    try:
+        source.connection.backup(target)
+    finally:
+        target.close()
+    _positions_cache().set(_position_key(alias), position, None)
+    return position
+
+
+def is_sticky(request):
+    try:
+        until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > time.time()
+
+
+def stick(response):
+    """Закрепляет клиента за основной базой на REPLICA_STICKY_SECONDS."""
+    seconds = settings.REPLICA_STICKY_SECONDS
+    response.set_cookie(
+        STICKY_COOKIE,
+        str(time.time() + seconds),
+        max_age=seconds,
+        httponly=True,
+        samesite="Lax",
+    )
+
+
+def require(position):
+    """Дальше в запросе читать только реплики со снимком не старше position."""
+    if _state.active:
+        _state.floor = max(_state.floor, position)
+
+
+def replica_reads(view):
+    """
+    Читает данные представления с реплик.
+
+    Запросы на запись и клиенты, недавно что-то записавшие, работают с
+    основной базой.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            not settings.REPLICA_DATABASES
+            or request.method not in ("GET", "HEAD")
+            or is_sticky(request)
+        ):
+            return view(request, *args, **kwargs)
+        _state.active = True
+        _state.positions = positions()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            # Возврат к значениям класса _State.
+            _state.__dict__.clear()
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Чтения внутри replica_reads — с реплик, запись — в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            not _state.active
+            or model._meta.app_label not in settings.REPLICA_APPS
+        ):
+            return None
+        fresh = [
+            alias
+            for alias, position in _state.positions.items()
+            if position > _state.floor
+        ]
+        # Одна реплика на запрос, пока она достаточно свежая.
+        if _state.alias not in fresh:
+            _state.alias = random.choice(fresh) if fresh else "default"
+        return _state.alias
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {"default", *settings.REPLICA_DATABASES}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплики вместе с данными.
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
@@ -0,0 +1,37 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+_counters = Counter()
+_lock = threading.Lock()
+_request = threading.local()
+
+
+def incr(name, delta=1):
+    """Увеличивает счетчик name этого процесса."""
+    with _lock:
+        _counters[name] += delta
+    counters = getattr(_request, "counters", None)
+    if counters is not None:
+        counters[name] += delta
+
+
+def snapshot():
+    """Текущие значения всех счетчиков процесса."""
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+
+
+@contextmanager
+def collect():
+    """Собирает приращения счетчиков в текущем потоке, например за запрос."""
+    _request.counters = Counter()
+    try:
+        yield _request.counters
+    finally:
+        _request.counters = None
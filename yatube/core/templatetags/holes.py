@@ -0,0 +1,11 @@
+from core import holes
+from django import template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **kwargs):
+    """Персональный фрагмент name (core.holes)."""
+    return mark_safe(holes.punch(context.get("request"), name, kwargs))
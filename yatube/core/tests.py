@@ -1,7 +1,34 @@
+import importlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import Client, TestCase
-from posts.models import User
+from core import middleware, replicas, stats
+from core.cache import TwoTierCache
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    LiveServerTestCase,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from posts.models import Comment, Post, User
 
 
 class CoreTests(TestCase):
@@ -20,3 +47,455 @@ class CoreTests(TestCase):
         response = self.guest_client.get("/unexisting_page/")
         self.assertTemplateUsed(response, "core/404.html")
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_stats_for_staff_only(self):
+        """
+        Счетчики процесса доступны только сотрудникам
+        """
+        stats.reset()
+        stats.incr("fragment.post_card.hit", 2)
+        url = reverse("stats")
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        staff = User.objects.create_user(username="staff", is_staff=True)
+        self.guest_client.force_login(staff)
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json(), {"fragment.post_card.hit": 2})
+
+
+class TwoTierCacheTests(TestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        options = {"NEAR_TIMEOUT": 60, "NEAR_MAX_ENTRIES": 2}
+        self.process_a = TwoTierCache("shared", {"OPTIONS": options})
+        self.process_b = TwoTierCache("shared", {"OPTIONS": options})
+
+    def test_near_cache_serves_reads(self):
+        """
+        Повторное чтение идет из кэша процесса, запись — в общий кэш
+        """
+        self.process_a.set("key", "first")
+        self.assertEqual(self.process_b.get("key"), "first")
+        self.process_a.set("key", "second")
+        self.assertEqual(caches["shared"].get("key"), "second")
+        self.assertEqual(self.process_a.get("key"), "second")
+        self.assertEqual(self.process_b.get("key"), "first")
+
+    def test_near_cache_expires(self):
+        """
+        Значение в кэше процесса живет не дольше NEAR_TIMEOUT
+        """
+        self.process_b.near_timeout = 0.01
+        self.process_a.set("key", "first")
+        self.assertEqual(self.process_b.get("key"), "first")
+        self.process_a.set("key", "second")
+        time.sleep(0.02)
+        self.assertEqual(self.process_b.get("key"), "second")
+
+    def test_near_cache_is_bounded(self):
+        """
+        Кэш процесса вытесняет давно не читанные ключи
+        """
+        for key in ("first", "second", "third"):
+            self.process_a.set(key, key)
+        self.assertEqual(len(self.process_a._near), 2)
+        self.assertEqual(self.process_a.get("first"), "first")
+
+    def test_delete_and_counters(self):
+        """
+        Удаление и счетчики сразу видны в общем кэше
+        """
+        self.process_a.set("key", "value")
+        self.process_a.delete("key")
+        self.assertIsNone(self.process_a.get("key"))
+        self.assertIsNone(caches["shared"].get("key"))
+        self.process_a.set("counter", 1)
+        self.assertEqual(self.process_a.incr("counter"), 2)
+        self.assertEqual(self.process_a.get("counter"), 2)
+
+
+class PrecompileTemplatesTests(SimpleTestCase):
+    def test_reports_compile_time_and_depth(self):
+        """
+        Команда компилирует все шаблоны и выводит цепочки include
+        """
+        out = StringIO()
+        call_command("precompile_templates", stdout=out)
+        output = out.getvalue()
+        self.assertIn("Скомпилировано шаблонов:", output)
+        self.assertIn(
+            "posts/index.html → base.html → includes/header.html", output
+        )
+
+    def test_syntax_errors_fail(self):
+        """
+        Шаблон с ошибкой синтаксиса завершает команду с ошибкой
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            with open(f"{directory}/broken.html", "w") as template:
+                template.write("{% if %}")
+            templates = [dict(settings.TEMPLATES[0], DIRS=[directory])]
+            with override_settings(TEMPLATES=templates):
+                with self.assertRaises(CommandError):
+                    call_command(
+                        "precompile_templates",
+                        stdout=StringIO(),
+                        stderr=StringIO(),
+                    )
+
+    def test_wsgi_logs_syntax_errors(self):
+        """
+        Сервер стартует с шаблоном с ошибкой, но сообщает о ней в лог
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            with open(f"{directory}/broken.html", "w") as template:
+                template.write("{% if %}")
+            templates = [dict(settings.TEMPLATES[0], DIRS=[directory])]
+            with override_settings(TEMPLATES=templates, CACHED_TEMPLATES=True):
+                with self.assertLogs("yatube.wsgi", "ERROR") as logs:
+                    importlib.reload(importlib.import_module("yatube.wsgi"))
+        self.assertIn("broken.html", logs.output[0])
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        middleware.profiles.clear()
+
+    def test_request_profile(self):
+        """
+        Замер запроса попадает в буфер и в заголовок Server-Timing
+        """
+        response = self.client.get(reverse("posts:index"))
+        self.assertIn("sql;dur=", response["Server-Timing"])
+        profile = middleware.profiles[-1]
+        self.assertEqual(profile["view"], "posts:index")
+        self.assertEqual(profile["status"], HTTPStatus.OK)
+        self.assertGreater(profile["sql_count"], 0)
+        self.assertGreater(profile["template_ms"], 0)
+        self.assertGreater(profile["cache_misses"], 0)
+
+    def test_duplicate_queries(self):
+        """
+        Одинаковые запросы с одинаковыми параметрами считаются повторами
+        """
+
+        def view(request):
+            for _ in range(3):
+                User.objects.filter(username="user").exists()
+            return HttpResponse()
+
+        profiling = middleware.ProfilingMiddleware(view)
+        response = profiling(RequestFactory().get("/"))
+        self.assertIn('2 duplicates', response["Server-Timing"])
+        self.assertEqual(middleware.profiles[-1]["duplicate_count"], 2)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_disabled(self):
+        """
+        При нулевой доле middleware не подключается
+        """
+        with self.assertRaises(MiddlewareNotUsed):
+            middleware.ProfilingMiddleware(HttpResponse)
+        response = self.client.get(reverse("posts:index"))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_admin_page(self):
+        """
+        Замеры видны сотрудникам на странице админки
+        """
+        staff = User.objects.create_user(username="staff", is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse("posts:index"))
+        response = self.client.get(reverse("profiling"))
+        self.assertContains(response, "posts:index")
+
+
+class LoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="user", password="password"
+        )
+        Post.objects.create(text="Пост", author=self.user)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.report = os.path.join(directory, "report.json")
+        self.scenario = os.path.join(directory, "scenario.json")
+        with open(self.scenario, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "authenticated_share": 1,
+                    "actions": [
+                        {"route": "posts:index", "pages": {"1": 1, "2": 1}},
+                        {
+                            "route": "posts:add_comment",
+                            "method": "post",
+                            "auth": True,
+                            "kwargs": {"post_id": "$post"},
+                            "data": {"text": "Комментарий"},
+                        },
+                    ],
+                },
+                file,
+            )
+
+    def loadtest(self, **options):
+        call_command(
+            "loadtest",
+            url=self.live_server_url,
+            users=1,
+            duration=1,
+            seed=1,
+            scenario=self.scenario,
+            output=self.report,
+            stdout=StringIO(),
+            stderr=StringIO(),
+            **options,
+        )
+        with open(self.report, encoding="utf-8") as file:
+            return json.load(file)
+
+    def test_report(self):
+        """
+        Отчет содержит перцентили и долю ошибок по маршрутам
+        """
+        report = self.loadtest()
+        self.assertEqual(
+            list(report["routes"]),
+            ["posts:add_comment", "posts:index", "users:login"],
+        )
+        self.assertEqual(report["total"]["error_rate"], 0)
+        self.assertTrue(Comment.objects.exists())
+        for route in report["routes"].values():
+            self.assertLessEqual(route["p50_ms"], route["p99_ms"])
+
+    def test_baseline_regression(self):
+        """
+        Падение RPS относительно прошлого прогона — ошибка команды
+        """
+        report = self.loadtest()
+        for route in report["routes"].values():
+            route["rps"] *= 100
+        baseline = f"{self.report}.baseline"
+        with open(baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file)
+        self.addCleanup(os.remove, baseline)
+        with self.assertRaisesMessage(CommandError, "Ухудшений"):
+            self.loadtest(baseline=baseline)
+
+
+class SqliteTuningTests(SimpleTestCase):
+    databases = {"default"}
+
+    @staticmethod
+    def start(func):
+        """Выполняет func в отдельном потоке со своим соединением."""
+        result = {}
+
+        def target():
+            try:
+                result["value"] = func()
+            except Exception as error:
+                result["error"] = error
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread, result
+
+    def join(self, thread, result):
+        thread.join(30)
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # Новые соединения потоков открывают файл базы: в памяти SQLite
+        # не поддерживает WAL.
+        patcher = mock.patch.dict(
+            connections.databases["default"],
+            NAME=os.path.join(directory, "db.sqlite3"),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def prepare():
+            call_command("migrate", verbosity=0)
+            user = User.objects.create_user(username="user")
+            post = Post.objects.create(text="Пост", author=user)
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                journal_mode = cursor.fetchone()[0]
+            return user, post, journal_mode
+
+        self.user, self.post, journal_mode = self.join(*self.start(prepare))
+        self.assertEqual(journal_mode, "wal")
+
+    def timed_request(self, method, url, data=None):
+        client = Client()
+        if method == "post":
+            client.force_login(self.user)
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data)
+        return response.status_code, time.perf_counter() - started
+
+    def test_writer_not_blocked_by_reader(self):
+        """
+        Комментарий сохраняется, пока другой запрос читает ленту
+        """
+        reading, written = threading.Event(), threading.Event()
+
+        def read():
+            with transaction.atomic():
+                list(Post.objects.all())
+                reading.set()
+                written.wait(10)
+
+        reader = self.start(read)
+        reading.wait(10)
+        status, seconds = self.join(
+            *self.start(
+                lambda: self.timed_request(
+                    "post",
+                    reverse("posts:add_comment", args=(self.post.pk,)),
+                    {"text": "Комментарий"},
+                )
+            )
+        )
+        written.set()
+        self.join(*reader)
+        self.assertEqual(status, HTTPStatus.FOUND)
+        self.assertLess(seconds, 1)
+
+    def test_reader_not_blocked_by_writer(self):
+        """
+        Лента открывается, пока другой запрос пишет комментарий
+        """
+        writing, read = threading.Event(), threading.Event()
+
+        def write():
+            with transaction.atomic():
+                Comment.objects.create(
+                    post=self.post, author=self.user, text="Комментарий"
+                )
+                writing.set()
+                read.wait(10)
+
+        writer = self.start(write)
+        writing.wait(10)
+        status, seconds = self.join(
+            *self.start(lambda: self.timed_request("get", "/"))
+        )
+        read.set()
+        self.join(*writer)
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertLess(seconds, 1)
+
+
+@override_settings(
+    REPLICA_DATABASES=["test_replica"], REPLICA_STICKY_SECONDS=60
+)
+class ReplicaTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.replica_path = os.path.join(directory, "replica.sqlite3")
+        patcher = mock.patch.dict(
+            connections.databases,
+            test_replica=dict(
+                connections.databases["default"], NAME=self.replica_path
+            ),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.close_replica)
+        self.author = User.objects.create_user(username="author")
+        self.post = Post.objects.create(
+            text="Из основной базы", author=self.author
+        )
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    @staticmethod
+    def close_replica():
+        if hasattr(connections._connections, "test_replica"):
+            connections["test_replica"].close()
+            delattr(connections._connections, "test_replica")
+
+    def mark_replica(self):
+        """Синхронизирует реплику и меняет в ней текст постов."""
+        call_command("sync_replicas")
+        with sqlite3.connect(self.replica_path) as replica:
+            replica.execute("UPDATE posts_post SET text = 'Из реплики'")
+
+    def test_feeds_read_from_replica(self):
+        """
+        Ленты и страница поста читаются с реплики
+        """
+        follower = Client()
+        follower.force_login(User.objects.create_user(username="follower"))
+        follower.get(
+            reverse("posts:profile_follow", args=(self.author.username,))
+        )
+        self.mark_replica()
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:profile", args=(self.author.username,)),
+            reverse("posts:post_detail", args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(Client().get(url), "Из реплики")
+        self.assertContains(
+            follower.get(reverse("posts:follow_index")), "Из реплики"
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).text, "Из основной базы"
+        )
+
+    def test_stale_replica_skipped(self):
+        """
+        Реплика старше последнего изменения ленты не используется
+        """
+        self.mark_replica()
+        Post.objects.create(text="Новый пост", author=self.author)
+        response = Client().get(reverse("posts:index"))
+        self.assertContains(response, "Новый пост")
+        self.assertContains(response, "Из основной базы")
+
+    def test_author_sticks_to_primary_after_write(self):
+        """
+        После записи автор читает основную базу, остальные — реплику
+        """
+        response = self.client.post(
+            reverse("posts:create_post"), {"text": "Свой пост"}
+        )
+        self.assertIn(replicas.STICKY_COOKIE, response.cookies)
+        call_command("sync_replicas")
+        # Реплика еще не получила новый пост.
+        with sqlite3.connect(self.replica_path) as replica:
+            replica.execute("DELETE FROM posts_post WHERE text = 'Свой пост'")
+        url = reverse("posts:profile", args=(self.author.username,))
+        # Другой адрес — своя копия в кэше страниц.
+        self.assertNotContains(Client().get(url + "?page=1"), "Свой пост")
+        self.assertContains(self.client.get(url), "Свой пост")
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_sticky_window_expires(self):
+        self.client.post(reverse("posts:create_post"), {"text": "Свой пост"})
+        self.mark_replica()
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotContains(response, "Свой пост")
+        self.assertContains(response, "Из реплики")
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_sync_without_replicas(self):
+        with self.assertRaises(CommandError):
+            call_command("sync_replicas")
@@ -1,5 +1,11 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import middleware
+from . import stats as counters
+
 
 def page_not_found(request, exception):
     return render(request, "core/404.html", {"path": request.path}, status=404)
@@ -15,3 +21,37 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=""):
     return render(request, "core/403csrf.html")
+
+
+@staff_member_required
+def stats(request):
+    """Счетчики процесса (попадания в кэш фрагментов и т. п.) в JSON."""
+    return JsonResponse(counters.snapshot())
+
+
+@staff_member_required
+def profiling(request):
+    """Последние замеры ProfilingMiddleware и сводка по представлениям."""
+    profiles = list(middleware.profiles)[::-1]
+    summary = {}
+    for profile in profiles:
+        summary.setdefault(profile["view"], []).append(profile)
+    views = [
+        {
+            "view": view,
+            "requests": len(items),
+            "total_ms": sum(item["total_ms"] for item in items) / len(items),
+            "max_ms": max(item["total_ms"] for item in items),
+            "sql_count": sum(item["sql_count"] for item in items) / len(items),
+            "duplicate_count": max(item["duplicate_count"] for item in items),
+        }
+        for view, items in summary.items()
+    ]
+    views.sort(key=lambda item: item["total_ms"], reverse=True)
+    context = {
+        "title": "Профилирование запросов",
+        "profiles": profiles,
+        "views": views,
+        "sample_rate": settings.PROFILING_SAMPLE_RATE,
+    }
+    return render(request, "core/profiling.html", context)
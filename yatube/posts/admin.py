@@ -1,4 +1,5 @@
 from django.contrib import admin
+from posts import search
 from posts.models import Comment, Follow, Group, Post
 
 
@@ -10,12 +11,20 @@ class PostAdmin(admin.ModelAdmin):
         "pub_date",
         "author",
         "group",
+        "views",
     )
     list_editable = ("group",)
+    readonly_fields = ("views",)
     search_fields = ("text",)
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту идет через индекс posts.search, а не LIKE.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search.matching(search_term)), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
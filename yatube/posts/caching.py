@@ -0,0 +1,299 @@
+import hashlib
+import random
+import time
+from functools import wraps
+
+from core import holes, replicas, stats
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+GLOBAL_SCOPE = "global"
+# Порядок ленты популярных меняет posts.ranking.refresh.
+POPULAR_SCOPE = "popular"
+# Рекомендации авторов меняет posts.recommendations.refresh.
+SUGGESTIONS_SCOPE = "suggestions"
+
+VERSION_PREFIX = "feed_version"
+PAGE_PREFIX = "feed_page"
+LOCK_PREFIX = "feed_lock"
+FRAGMENT_PREFIX = "fragment"
+
+
+def group_scope(slug):
+    return f"group:{slug}"
+
+
+def author_scope(username):
+    return f"author:{username}"
+
+
+def post_scope(post_id):
+    return f"post:{post_id}"
+
+
+def suggestions_scope(user_id):
+    return f"suggestions:{user_id}"
+
+
+def make_key(prefix, value):
+    return f"{prefix}:{hashlib.md5(value.encode()).hexdigest()}"
+
+
+def _initial_version():
+    # Версия — время последнего изменения области в миллисекундах: по ней
+    # считается Last-Modified. После вытеснения счетчика версия не
+    # совпадет с прежней.
+    return int(time.time() * 1000)
+
+
+def _versions_cache():
+    # Версии читаются мимо кэша процесса (core.cache.TwoTierCache),
+    # чтобы все процессы одинаково видели сброс страниц.
+    return getattr(cache, "shared", cache)
+
+
+def get_versions(scopes):
+    versions_cache = _versions_cache()
+    keys = [make_key(VERSION_PREFIX, scope) for scope in scopes]
+    versions = versions_cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions_cache.add(key, _initial_version(), None)
+            versions[key] = versions_cache.get(key)
+    versions = tuple(versions[key] for key in keys)
+    # Страница с этими версиями не должна читать данные старше них.
+    replicas.require(max(versions, default=0))
+    return versions
+
+
+def bump_versions(*scopes):
+    """Сбрасывает закэшированные страницы, зависящие от scopes."""
+    versions_cache = _versions_cache()
+    keys = [make_key(VERSION_PREFIX, scope) for scope in set(scopes)]
+    versions = versions_cache.get_many(keys)
+    now = _initial_version()
+    for key in keys:
+        # Атомарный incr сдвигает версию к текущему времени, но не меньше
+        # чем на единицу, даже при одновременных изменениях.
+        delta = max(1, now - versions.get(key, now))
+        try:
+            versions_cache.incr(key, delta)
+        except ValueError:
+            versions_cache.add(key, now, None)
+
+
+def post_scopes(post):
+    scopes = [
+        GLOBAL_SCOPE,
+        author_scope(post.author.username),
+        post_scope(post.pk),
+    ]
+    if post.group_id:
+        scopes.append(group_scope(post.group.slug))
+    return scopes
+
+
+def request_versions(request, scopes):
+    """Версии scopes, запомненные на время запроса."""
+    memo = request.__dict__.setdefault("_feed_versions", {})
+    scopes = tuple(scopes)
+    if scopes not in memo:
+        memo[scopes] = get_versions(scopes)
+    return memo[scopes]
+
+
+def conditional_response(request, scopes, render):
+    """
+    Отвечает 304 Not Modified, если страница не менялась, иначе render().
+
+    Валидаторы считаются по версиям scopes без шаблонов и запросов к
+    базе: ETag — по версиям, пользователю, cookie CSRF (токен в формах
+    страницы) и адресу, Last-Modified — по времени последнего изменения
+    областей. Прежней копии из cached_page валидаторы не ставятся: она
+    собрана по старым версиям.
+    """
+    versions = request_versions(request, scopes)
+    etag = hashlib.md5(
+        ":".join(
+            (
+                str(versions),
+                str(request.user.pk),
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+                request.get_full_path(),
+            )
+        ).encode()
+    ).hexdigest()
+    etag = f'W/"{etag}"'
+    # Вход и выход не меняют время изменения страницы, поэтому
+    # Last-Modified отдается только гостям: иначе клиент без If-None-Match
+    # получил бы 304 с чужой шапкой.
+    last_modified = None
+    if not request.user.is_authenticated:
+        last_modified = max(versions) // 1000
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = render()
+    if response.status_code in (200, 304) and not getattr(
+        response, "stale", False
+    ):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def conditional_feed(scopes, personal=None):
+    """
+    Условные GET для страниц лент с областями scopes (как у cache_feed).
+
+    personal(user) — области персональных фрагментов страницы для
+    авторизованного пользователя, они тоже входят в ETag.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            page_scopes = scopes(**kwargs)
+            if personal is not None and request.user.is_authenticated:
+                page_scopes = page_scopes + personal(request.user)
+            return conditional_response(
+                request,
+                page_scopes,
+                lambda: view(request, *args, **kwargs),
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def _cached_response(request, entry):
+    # У копий прежнего формата дыр нет.
+    content = holes.fill(
+        request, entry["content"], entry.get("token"), entry.get("holes")
+    )
+    return HttpResponse(content, content_type=entry["content_type"])
+
+
+def _make_entry(response, content, versions, punched):
+    timeout = settings.FEED_CACHE_TIMEOUT
+    return {
+        "versions": versions,
+        # Разброс, чтобы страницы не устаревали одновременно.
+        "expires": time.time() + timeout * random.uniform(0.9, 1),
+        "content": content,
+        "content_type": response["Content-Type"],
+        "token": punched["token"],
+        "holes": punched["holes"],
+    }
+
+
+def _page_path(request):
+    # Общая копия одна на адрес, персональные фрагменты подставляются
+    # при каждом ответе. Без FEED_CACHE_SHARED копия у каждого
+    # пользователя своя.
+    if settings.FEED_CACHE_SHARED:
+        return request.get_full_path()
+    return f"{request.user.pk}:{request.get_full_path()}"
+
+
+def cached_page(request, scopes, render):
+    """
+    Страница из кэша до изменения версии одной из областей scopes, иначе
+    render().
+
+    Пока один запрос пересобирает устаревшую страницу, остальные
+    получают прежнюю копию.
+    """
+    versions = request_versions(request, scopes)
+    path = _page_path(request)
+    key = make_key(PAGE_PREFIX, path)
+    lock_key = make_key(LOCK_PREFIX, path)
+    locked = False
+    entry = cache.get(key)
+    if entry is not None:
+        fresh = (
+            entry["versions"] == versions and entry["expires"] > time.time()
+        )
+        if fresh:
+            return _cached_response(request, entry)
+        locked = cache.add(lock_key, 1, settings.FEED_CACHE_LOCK_TIMEOUT)
+        if not locked:
+            response = _cached_response(request, entry)
+            response.stale = True
+            return response
+    punched = {"token": "", "holes": []}
+    try:
+        if settings.FEED_CACHE_SHARED:
+            with holes.collect() as punched:
+                response = render()
+        else:
+            response = render()
+        if response.streaming:
+            return response
+        content = response.content.decode(response.charset)
+        if response.status_code == 200:
+            cache.set(
+                key,
+                _make_entry(response, content, versions, punched),
+                settings.FEED_CACHE_TIMEOUT
+                + settings.FEED_CACHE_STALE_TIMEOUT,
+            )
+        response.content = holes.fill(
+            request, content, punched["token"], punched["holes"]
+        )
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return response
+
+
+def cache_feed(scopes):
+    """
+    Кэширует страницу ленты (cached_page) с областями scopes.
+
+    scopes получает именованные аргументы представления и возвращает
+    список областей.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            return cached_page(
+                request,
+                scopes(**kwargs),
+                lambda: view(request, *args, **kwargs),
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def cached_fragment(name, scopes, vary_on, render):
+    """
+    Возвращает фрагмент шаблона из кэша или рендерит его через render().
+
+    Фрагмент устаревает при смене версии одной из областей scopes или
+    значений vary_on. Попадания и промахи считаются в core.stats как
+    fragment.<name>.hit и fragment.<name>.miss.
+    """
+    versions = get_versions(scopes)
+    key = make_key(FRAGMENT_PREFIX, f"{name}:{versions}:{vary_on}")
+    html = cache.get(key)
+    if html is not None:
+        stats.incr(f"fragment.{name}.hit")
+        return html
+    stats.incr(f"fragment.{name}.miss")
+    html = render()
+    cache.set(key, html, settings.FEED_CACHE_TIMEOUT)
+    return html
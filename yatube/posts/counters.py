@@ -0,0 +1,80 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from posts.models import Comment, Follow, Group, Post, User, UserCounters
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        # Счетчик с расхождением не уходит в минус, его исправит reconcile.
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_user_counter(user_id, field, delta):
+    _change(UserCounters.objects.filter(user_id=user_id), field, delta)
+
+
+def change_group_counter(group_id, delta):
+    if group_id:
+        _change(Group.objects.filter(pk=group_id), "posts_count", delta)
+
+
+def change_comments_counter(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), "comments_count", delta)
+
+
+def _count(model, field):
+    """Подзапрос с фактическим количеством строк model по полю field."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _repair(queryset, field, actual):
+    drifted = queryset.annotate(actual=actual).exclude(**{field: F("actual")})
+    return queryset.filter(pk__in=drifted.values("pk")).update(
+        **{field: actual}
+    )
+
+
+def reconcile():
+    """
+    Пересчитывает все счетчики по фактическим данным.
+
+    Возвращает количество исправленных строк для каждого счетчика.
+    """
+    UserCounters.objects.bulk_create(
+        (
+            UserCounters(user_id=user_id)
+            for user_id in User.objects.filter(
+                counters__isnull=True
+            ).values_list("pk", flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    counters = UserCounters.objects.all()
+    return {
+        "user.posts_count": _repair(
+            counters, "posts_count", _count(Post, "author")
+        ),
+        "user.followers_count": _repair(
+            counters, "followers_count", _count(Follow, "author")
+        ),
+        "user.following_count": _repair(
+            counters, "following_count", _count(Follow, "user")
+        ),
+        "group.posts_count": _repair(
+            Group.objects.all(), "posts_count", _count(Post, "group")
+        ),
+        "post.comments_count": _repair(
+            Post.objects.all(), "comments_count", _count(Comment, "post")
+        ),
+    }
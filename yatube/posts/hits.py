@@ -0,0 +1,111 @@
+"""
+Буферизованный счетчик просмотров постов.
+
+Просмотры копятся в памяти процесса и не реже раза в HITS_FLUSH_INTERVAL
+секунд записываются в Post.views фоновым потоком: одна транзакция, по
+UPDATE на каждое встретившееся приращение. Буфер хранит не больше
+HITS_BUFFER_SIZE постов, просмотры новых постов сверх этого
+отбрасываются. Просмотры, накопленные с последнего сброса, теряются при
+остановке процесса: счетчик приблизительный.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from core import stats
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+# Параметров в одном UPDATE: SQLite принимает не больше 999.
+FLUSH_BATCH_SIZE = 900
+
+_buffer = Counter()
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+_flushing = False
+_executor = None
+
+
+def record(post_id):
+    """Учитывает просмотр поста без запроса к базе."""
+    global _flushing
+    with _lock:
+        full = len(_buffer) >= settings.HITS_BUFFER_SIZE
+        if full and post_id not in _buffer:
+            dropped = True
+        else:
+            dropped = False
+            _buffer[post_id] += 1
+        due = (
+            full
+            or time.monotonic() - _last_flush >= settings.HITS_FLUSH_INTERVAL
+        )
+        start = due and not _flushing and _background_allowed()
+        if start:
+            _flushing = True
+    if dropped:
+        stats.incr("hits.dropped")
+    if start:
+        _get_executor().submit(_run)
+
+
+def pending():
+    """Несохраненные просмотры {id поста: число}."""
+    with _lock:
+        return dict(_buffer)
+
+
+def flush():
+    """Записывает накопленные просмотры в базу, возвращает их число."""
+    global _buffer, _last_flush
+    with _lock:
+        hits, _buffer = _buffer, Counter()
+        _last_flush = time.monotonic()
+    by_delta = defaultdict(list)
+    for post_id, delta in hits.items():
+        by_delta[delta].append(post_id)
+    with transaction.atomic():
+        for delta, post_ids in by_delta.items():
+            for start in range(0, len(post_ids), FLUSH_BATCH_SIZE):
+                stop = start + FLUSH_BATCH_SIZE
+                Post.objects.filter(pk__in=post_ids[start:stop]).update(
+                    views=F("views") + delta
+                )
+    total = sum(hits.values())
+    stats.incr("hits.flushed", total)
+    return total
+
+
+def _background_allowed():
+    # База SQLite в памяти (тесты) доступна другим потокам только через
+    # общий кэш, где параллельная запись сразу падает с "table is
+    # locked": там просмотры сбрасывает только явный flush().
+    connection = connections["default"]
+    return not (connection.vendor == "sqlite" and connection.is_in_memory_db())
+
+
+def _run():
+    global _flushing
+    try:
+        flush()
+    except Exception:
+        # Просмотры пачки теряются: счетчик приблизительный.
+        logger.exception("Не удалось сохранить просмотры постов")
+    finally:
+        _flushing = False
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="hits"
+        )
+    return _executor
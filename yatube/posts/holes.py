@@ -0,0 +1,52 @@
+"""Персональные фрагменты страниц постов для общего кэша (core.holes)."""
+from core import holes
+from django.template.loader import render_to_string
+from posts.models import Follow
+
+from . import recommendations
+from .forms import CommentForm
+
+holes.register_template("feed_switcher", "posts/includes/switcher.html")
+holes.register_template(
+    "post_edit_button", "posts/includes/post_edit_button.html"
+)
+
+
+@holes.register("follow_button")
+def follow_button(request, username):
+    following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(
+            user=request.user, author__username=username
+        ).exists()
+    )
+    return render_to_string(
+        "posts/includes/follow_button.html",
+        {"username": username, "following": following},
+        request=request,
+    )
+
+
+@holes.register("comment_form")
+def comment_form(request, post_id):
+    return render_to_string(
+        "posts/includes/comment_form.html",
+        {"post_id": post_id, "form": CommentForm()},
+        request=request,
+    )
+
+
+@holes.register("who_to_follow")
+def who_to_follow(request, exclude=None):
+    authors = []
+    if request.user.is_authenticated:
+        authors = [
+            (username, name)
+            for username, name in recommendations.suggestions(request.user)
+            if username != exclude
+        ]
+    return render_to_string(
+        "posts/includes/who_to_follow.html",
+        {"authors": authors},
+        request=request,
+    )
@@ -0,0 +1,38 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает пользователей, группы, посты, комментарии и подписки "
+        "в NDJSON (по записи на строку, .gz — со сжатием)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="Файл дампа или - для стандартного вывода."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        started = time.perf_counter()
+        if path == "-":
+            exported = transfer.export(sys.stdout)
+        else:
+            with transfer.open_dump(path, "wt") as stream:
+                exported = transfer.export(stream)
+        seconds = time.perf_counter() - started
+        # При выводе в stdout отчет уходит в stderr, чтобы не портить дамп.
+        report = self.stderr if path == "-" else self.stdout
+        for label, rows in exported.items():
+            report.write(f"{label}: {rows}")
+        total = sum(exported.values())
+        report.write(
+            self.style.SUCCESS(
+                f"Выгружено записей: {total} за {seconds:.1f} с "
+                f"({total / max(seconds, 1e-9):.0f} записей/с)"
+            )
+        )
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Создает недостающие миниатюры картинок постов: загруженных до "
+        "появления миниатюр или после сбоя фоновой задачи."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Постов в одной выборке.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Потоков для создания миниатюр.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size должен быть больше нуля.")
+        with ThreadPoolExecutor(
+            max_workers=options["workers"], thread_name_prefix="thumbnails"
+        ) as executor:
+            generated = thumbnails.generate_missing(
+                executor, options["batch_size"]
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Созданы миниатюры картинок: {generated}")
+        )
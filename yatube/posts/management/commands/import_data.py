@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает дамп export_data пачками через bulk_create и "
+        "пересобирает счетчики, ленты, поисковый индекс и миниатюры."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл дампа (.ndjson или .gz).")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Записей в одной транзакции.",
+        )
+        parser.add_argument(
+            "--media-root",
+            help="MEDIA_ROOT исходного экземпляра, откуда копировать "
+            "картинки постов.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Потоков для копирования картинок и создания миниатюр.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Продолжить прерванный импорт с последней пачки. Без "
+            "этого флага импорт идет только в пустую базу.",
+        )
+        parser.add_argument(
+            "--no-thumbnails",
+            action="store_false",
+            dest="thumbnails",
+            help="Не создавать миниатюры картинок.",
+        )
+
+    def report(self, label, rows, seconds):
+        if self.verbosity > 1:
+            self.stdout.write(
+                f"{label}: +{rows} ({rows / max(seconds, 1e-9):.0f} "
+                "записей/с)"
+            )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size должен быть больше нуля.")
+        self.verbosity = options["verbosity"]
+        importer = transfer.Importer(
+            options["path"],
+            batch_size=options["batch_size"],
+            media_root=options["media_root"],
+            workers=options["workers"],
+            resume=options["resume"],
+            report=self.report,
+        )
+        try:
+            seconds = importer.run(with_thumbnails=options["thumbnails"])
+        except (OSError, ValueError) as error:
+            # Загруженные пачки сохранены: импорт продолжит --resume.
+            raise CommandError(error) from error
+        for label, rows in importer.rows.items():
+            rate = rows / max(importer.seconds[label], 1e-9)
+            self.stdout.write(f"{label}: {rows} ({rate:.0f} записей/с)")
+        for label, conflicts in importer.conflicts.items():
+            if conflicts:
+                self.stderr.write(
+                    f"{label}: пропущено записей, уже бывших в базе: "
+                    f"{conflicts}"
+                )
+        if importer.missing_images:
+            self.stderr.write(
+                f"Не найдено картинок: {importer.missing_images}"
+            )
+        total = sum(importer.rows.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено записей: {total} за {seconds:.1f} с"
+            )
+        )
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from posts import ranking
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает оценки ленты популярных для новых и изменившихся "
+        "постов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересчитать все посты, например после смены весов.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Постов в одной транзакции.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Повторять пересчет каждые N секунд до прерывания.",
+        )
+
+    def handle(self, *args, **options):
+        full = options["full"]
+        while True:
+            started = time.perf_counter()
+            updated = ranking.refresh(options["batch_size"], full=full)
+            seconds = time.perf_counter() - started
+            self.stdout.write(
+                f"Пересчитано оценок: {updated} за {seconds:.1f} с"
+            )
+            if not options["interval"]:
+                return
+            # Полный пересчет нужен один раз, дальше — только изменения.
+            full = False
+            time.sleep(options["interval"])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Строит поисковый индекс по всем постам и комментариям."
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проиндексировано постов: {Post.objects.count()}"
+            )
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts import timeline
+from posts.models import Follow, TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет и пересобирает персональные ленты подписчиков "
+        "(FOLLOW_TIMELINE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Пересобрать ленты только этих пользователей.",
+        )
+
+    def handle(self, *args, **options):
+        usernames = options["usernames"]
+        if usernames:
+            user_ids = list(
+                User.objects.filter(username__in=usernames).values_list(
+                    "pk", flat=True
+                )
+            )
+            if len(user_ids) != len(set(usernames)):
+                raise CommandError("Не все пользователи найдены.")
+        else:
+            followers = Follow.objects.values_list("user_id", flat=True)
+            stale = TimelineEntry.objects.values_list("user_id", flat=True)
+            user_ids = sorted(set(followers) | set(stale))
+        for user_id in user_ids:
+            timeline.rebuild(user_id)
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересобрано лент: {len(user_ids)}")
+        )
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рекомендации авторов по графу подписок."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Пользователей в одной транзакции.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Повторять пересчет каждые N секунд до прерывания.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            users = recommendations.refresh(options["batch_size"])
+            seconds = time.perf_counter() - started
+            self.stdout.write(
+                f"Рекомендации для {users} пользователей за {seconds:.1f} с"
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
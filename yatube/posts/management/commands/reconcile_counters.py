@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики постов, комментариев и подписок."
+
+    def handle(self, *args, **options):
+        for name, fixed in counters.reconcile().items():
+            self.stdout.write(f"{name}: исправлено {fixed}")
+        self.stdout.write(self.style.SUCCESS("Счетчики сверены."))
@@ -0,0 +1,95 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Наполняет базу правдоподобными данными для нагрузочных тестов: "
+        "популярность авторов и групп по закону Ципфа, посты сериями, "
+        "ветки комментариев."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--groups", type=int, default=100)
+        parser.add_argument("--posts", type=int, default=100_000)
+        parser.add_argument("--comments", type=int, default=100_000)
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=50,
+            help="Среднее число подписок пользователя.",
+        )
+        parser.add_argument(
+            "--images",
+            type=float,
+            default=0.0,
+            help="Доля постов с картинкой, от 0 до 1.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="За сколько последних дней распределить посты.",
+        )
+        parser.add_argument(
+            "--exponent",
+            type=float,
+            default=1.0,
+            help="Показатель закона Ципфа для популярности авторов и групп.",
+        )
+        parser.add_argument(
+            "--password",
+            default="password",
+            help="Пароль всех созданных пользователей.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=2022,
+            help="Одинаковый seed дает одинаковые данные.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Потоков для создания миниатюр.",
+        )
+
+    def report(self, name, rows, seconds):
+        if self.verbosity > 1:
+            self.stdout.write(
+                f"{name}: +{rows} ({rows / max(seconds, 1e-9):.0f} записей/с)"
+            )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size должен быть больше нуля.")
+        if not 0 <= options["images"] <= 1:
+            raise CommandError("--images должен быть от 0 до 1.")
+        self.verbosity = options["verbosity"]
+        seeder = Seeder(
+            users=options["users"],
+            groups=options["groups"],
+            posts=options["posts"],
+            comments=options["comments"],
+            follows=options["follows"],
+            images=options["images"],
+            days=options["days"],
+            exponent=options["exponent"],
+            password=options["password"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+            report=self.report,
+        )
+        seconds = seeder.run(workers=options["workers"])
+        for name, rows in seeder.rows.items():
+            rate = rows / max(seeder.seconds[name], 1e-9)
+            self.stdout.write(f"{name}: {rows} ({rate:.0f} записей/с)")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано записей: {sum(seeder.rows.values())} "
+                f"за {seconds:.1f} с"
+            )
+        )
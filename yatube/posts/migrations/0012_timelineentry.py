@@ -0,0 +1,68 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_auto_20221101_2345'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'pub_date',
+                    models.DateTimeField(verbose_name='Дата публикации'),
+                ),
+                (
+                    'post',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='timeline_entries',
+                        to='posts.Post',
+                        verbose_name='Пост',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='timeline',
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name='Подписчик',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(
+                fields=['user', '-pub_date'], name='timeline_user_pub_date'
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        ),
+    ]
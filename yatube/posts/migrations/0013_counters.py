@@ -0,0 +1,109 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def _totals(model, field):
+    return (
+        model.objects.order_by()
+        .values_list(field)
+        .annotate(total=Count('pk'))
+        .iterator()
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserCounters = apps.get_model('posts', 'UserCounters')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+
+    UserCounters.objects.bulk_create(
+        (
+            UserCounters(user_id=user_id)
+            for user_id in User.objects.values_list('pk', flat=True)
+        ),
+        batch_size=1000,
+    )
+    for field, model, lookup in (
+        ('posts_count', Post, 'author'),
+        ('followers_count', Follow, 'author'),
+        ('following_count', Follow, 'user'),
+    ):
+        for user_id, total in _totals(model, lookup):
+            UserCounters.objects.filter(user_id=user_id).update(
+                **{field: total}
+            )
+    for group_id, total in _totals(Post, 'group'):
+        Group.objects.filter(pk=group_id).update(posts_count=total)
+    for post_id, total in _totals(Comment, 'post'):
+        Post.objects.filter(pk=post_id).update(comments_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0012_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                (
+                    'user',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='counters',
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name='Пользователь',
+                    ),
+                ),
+                (
+                    'posts_count',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Количество постов'
+                    ),
+                ),
+                (
+                    'followers_count',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Количество подписчиков'
+                    ),
+                ),
+                (
+                    'following_count',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Количество подписок'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Счетчики пользователя',
+                'verbose_name_plural': 'Счетчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='Количество постов'
+            ),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='Количество комментариев'
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='timelineentry',
+            name='timeline_user_pub_date',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(
+                fields=['post', 'created'], name='comment_post_created'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(
+                fields=['author', 'user'], name='follow_author_user'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(
+                fields=['group', 'pub_date'], name='post_group_pub_date'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(
+                fields=['author', 'pub_date'], name='post_author_pub_date'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date',
+            ),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = 'posts_search'
+
+
+def create_fts_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+    if 'ENABLE_FTS5' not in options:
+        # Поиск будет работать через модель SearchTerm.
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+        "post, comments, tokenize = 'unicode61 remove_diacritics 0')"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'term',
+                    models.CharField(
+                        max_length=64, verbose_name='Основа слова'
+                    ),
+                ),
+                (
+                    'weight',
+                    models.PositiveIntegerField(default=0, verbose_name='Вес'),
+                ),
+                (
+                    'post',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='search_terms',
+                        to='posts.Post',
+                        verbose_name='Пост',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Основа слова',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(
+                fields=('term', 'post'), name='unique_search_term'
+            ),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='views',
+            field=models.PositiveIntegerField(
+                db_index=True, default=0, verbose_name='Просмотры'
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRank',
+            fields=[
+                (
+                    'post',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='rank',
+                        serialize=False,
+                        to='posts.Post',
+                        verbose_name='Пост',
+                    ),
+                ),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                (
+                    'comments',
+                    models.PositiveIntegerField(verbose_name='Комментарии'),
+                ),
+                (
+                    'followers',
+                    models.PositiveIntegerField(
+                        verbose_name='Подписчики автора'
+                    ),
+                ),
+                (
+                    'views',
+                    models.PositiveIntegerField(verbose_name='Просмотры'),
+                ),
+            ],
+            options={
+                'verbose_name': 'Рейтинг поста',
+                'verbose_name_plural': 'Рейтинги постов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postrank',
+            index=models.Index(
+                fields=['score', 'post'], name='post_rank_score'
+            ),
+        ),
+    ]
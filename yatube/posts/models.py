@@ -9,6 +9,7 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField("Количество постов", default=0)
 
     def __str__(self):
         return self.title
@@ -45,6 +46,11 @@ class Post(CreatedModel):
         verbose_name="Картинка",
         help_text="Добавить картинку",
     )
+    comments_count = models.PositiveIntegerField(
+        "Количество комментариев", default=0
+    )
+    # Пополняется пачками из буфера posts.hits и может немного отставать.
+    views = models.PositiveIntegerField("Просмотры", default=0, db_index=True)
 
     def __str__(self):
         return self.text[:15]
@@ -53,6 +59,16 @@ class Post(CreatedModel):
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
         ordering = ("-pub_date",)
+        indexes = (
+            models.Index(
+                name="post_group_pub_date",
+                fields=["group", "pub_date"],
+            ),
+            models.Index(
+                name="post_author_pub_date",
+                fields=["author", "pub_date"],
+            ),
+        )
 
 
 class Comment(CreatedModel):
@@ -76,6 +92,12 @@ class Comment(CreatedModel):
     class Meta:
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = (
+            models.Index(
+                name="comment_post_created",
+                fields=["post", "created"],
+            ),
+        )
 
 
 class Follow(CreatedModel):
@@ -106,3 +128,159 @@ class Follow(CreatedModel):
                 check=~models.Q(user=models.F("author")),
             ),
         )
+        # Индекс (user, author) создает ограничение unique_relationships.
+        indexes = (
+            models.Index(
+                name="follow_author_user",
+                fields=["author", "user"],
+            ),
+        )
+
+
+class UserCounters(models.Model):
+    """
+    Счетчики пользователя, которые поддерживаются сигналами (posts.counters),
+    чтобы страницы не считали их агрегатными запросами.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="counters",
+        verbose_name="Пользователь",
+    )
+    posts_count = models.PositiveIntegerField("Количество постов", default=0)
+    followers_count = models.PositiveIntegerField(
+        "Количество подписчиков", default=0
+    )
+    following_count = models.PositiveIntegerField(
+        "Количество подписок", default=0
+    )
+
+    class Meta:
+        verbose_name = "Счетчики пользователя"
+        verbose_name_plural = "Счетчики пользователей"
+
+
+class TimelineEntry(models.Model):
+    """
+    Запись персональной ленты подписчика: заполняется при публикации поста
+    (fan-out on write), чтобы лента подписок читалась одним срезом.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Подписчик",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пост",
+    )
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = (
+            models.UniqueConstraint(
+                name="unique_timeline_entry",
+                fields=["user", "post"],
+            ),
+        )
+        indexes = (
+            models.Index(
+                name="timeline_user_pub_date",
+                fields=["user", "pub_date", "post"],
+            ),
+        )
+
+
+class SearchTerm(models.Model):
+    """
+    Запись инвертированного индекса поиска (posts.search), если SQLite
+    собран без FTS5: основа слова и ее вес в тексте поста и комментариев.
+    """
+
+    term = models.CharField("Основа слова", max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="search_terms",
+        verbose_name="Пост",
+    )
+    weight = models.PositiveIntegerField("Вес", default=0)
+
+    class Meta:
+        verbose_name = "Основа слова"
+        verbose_name_plural = "Поисковый индекс"
+        constraints = (
+            models.UniqueConstraint(
+                name="unique_search_term",
+                fields=["term", "post"],
+            ),
+        )
+
+
+class PostRank(models.Model):
+    """
+    Оценка поста для ленты популярных (posts.ranking) вместе с данными,
+    по которым она посчитана: пересчитываются только изменившиеся посты.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="rank",
+        verbose_name="Пост",
+    )
+    score = models.FloatField("Оценка")
+    comments = models.PositiveIntegerField("Комментарии")
+    followers = models.PositiveIntegerField("Подписчики автора")
+    views = models.PositiveIntegerField("Просмотры")
+
+    class Meta:
+        verbose_name = "Рейтинг поста"
+        verbose_name_plural = "Рейтинги постов"
+        indexes = (
+            models.Index(
+                name="post_rank_score",
+                fields=["score", "post"],
+            ),
+        )
+
+
+class FollowSuggestion(models.Model):
+    """
+    Рекомендованный пользователю автор (posts.recommendations): считается
+    офлайн по графу подписок и заменяется целиком при каждом пересчете.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="suggestions",
+        verbose_name="Пользователь",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="suggested_to",
+        verbose_name="Автор",
+    )
+    score = models.PositiveIntegerField("Оценка")
+
+    class Meta:
+        verbose_name = "Рекомендация автора"
+        verbose_name_plural = "Рекомендации авторов"
+        indexes = (
+            models.Index(
+                name="follow_suggestion_score",
+                fields=["user", "score", "author"],
+            ),
+        )
@@ -0,0 +1,93 @@
+"""
+Рейтинг популярных постов.
+
+Вовлеченность поста — взвешенная сумма комментариев, подписчиков автора
+и просмотров с весами POPULAR_WEIGHTS. Оценка —
+
+    log2(1 + вовлеченность) + часы от начала эпохи / POPULAR_HALF_LIFE
+
+Второе слагаемое растет одинаково для всех постов, поэтому порядок по
+оценке совпадает с порядком по вовлеченности, которая вдвое теряет вес
+за каждые POPULAR_HALF_LIFE часов возраста поста. Сохраненная оценка не
+устаревает со временем: refresh() пересчитывает только новые посты и
+посты, у которых изменились комментарии, просмотры или подписчики
+автора.
+"""
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from posts.models import Post, PostRank
+
+from .caching import POPULAR_SCOPE, bump_versions
+
+
+def score(pub_date, comments, followers, views):
+    weights = settings.POPULAR_WEIGHTS
+    engagement = (
+        weights["comments"] * comments
+        + weights["followers"] * followers
+        + weights["views"] * views
+    )
+    hours = pub_date.timestamp() / 3600
+    return math.log2(1 + engagement) + hours / settings.POPULAR_HALF_LIFE
+
+
+def feed():
+    """Оценки постов от лучшей к худшей (индекс post_rank_score)."""
+    return PostRank.objects.select_related(
+        "post__author", "post__group"
+    ).order_by("-score", "-post_id")
+
+
+def _inputs(full):
+    posts = Post.objects.annotate(
+        followers=Coalesce("author__counters__followers_count", 0)
+    )
+    if not full:
+        posts = posts.filter(
+            Q(rank__isnull=True)
+            | ~Q(rank__comments=F("comments_count"))
+            | ~Q(rank__views=F("views"))
+            | ~Q(rank__followers=F("followers"))
+        )
+    return posts.order_by("pk").values_list(
+        "pk", "pub_date", "comments_count", "followers", "views"
+    )
+
+
+def refresh(batch_size=1000, full=False):
+    """
+    Пересчитывает оценки устаревших постов пачками по batch_size, с
+    full=True — всех постов (например, после смены весов).
+
+    Возвращает число пересчитанных постов.
+    """
+    inputs = _inputs(full)
+    last_pk, updated = 0, 0
+    while True:
+        rows = list(inputs.filter(pk__gt=last_pk)[:batch_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        ranks = [
+            PostRank(
+                post_id=pk,
+                score=score(pub_date, comments, followers, views),
+                comments=comments,
+                followers=followers,
+                views=views,
+            )
+            for pk, pub_date, comments, followers, views in rows
+        ]
+        with transaction.atomic():
+            PostRank.objects.filter(
+                post_id__in=[rank.post_id for rank in ranks]
+            ).delete()
+            PostRank.objects.bulk_create(ranks)
+        updated += len(ranks)
+    if updated:
+        bump_versions(POPULAR_SCOPE)
+    return updated
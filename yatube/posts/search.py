@@ -0,0 +1,253 @@
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.expressions import RawSQL
+from posts.models import Comment, Post, SearchTerm
+
+from .stemmer import stem
+from .utils import get_page
+
+FTS_TABLE = "posts_search"
+
+# Слово поста весит больше слова из комментариев к нему.
+POST_WEIGHT = 2
+COMMENT_WEIGHT = 1
+
+WORD_RE = re.compile(r"[^\W_]+")
+MAX_TERM_LENGTH = 64
+REBUILD_BATCH_SIZE = 500
+
+_pending = threading.local()
+_fts_tables = {}
+
+
+def terms(text):
+    """Основы слов текста в порядке следования."""
+    return [
+        stem(word)[:MAX_TERM_LENGTH] for word in WORD_RE.findall(text.lower())
+    ]
+
+
+def _query_terms(query):
+    return list(dict.fromkeys(terms(query)))
+
+
+class FtsBackend:
+    """Индекс в виртуальной таблице SQLite FTS5 с ранжированием bm25."""
+
+    def index(self, post_id, post_terms, comment_terms):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id]
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, post, comments) "
+                "VALUES (%s, %s, %s)",
+                [post_id, " ".join(post_terms), " ".join(comment_terms)],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    @staticmethod
+    def _match(query_terms):
+        # Основы состоят только из букв и цифр, кавычки им не нужны,
+        # но защищают от операторов FTS5 вроде AND и NOT.
+        return " ".join(f'"{term}"' for term in query_terms)
+
+    def ranked_ids(self, query_terms):
+        return FtsResults(self._match(query_terms))
+
+    def matching_ids(self, query_terms):
+        return RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [self._match(query_terms)],
+        )
+
+
+class FtsResults:
+    """Id постов по убыванию релевантности, с поддержкой Paginator."""
+
+    def __init__(self, match):
+        self.match = match
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, index):
+        start, stop = index.start or 0, index.stop
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, %s, %s), rowid DESC "
+                "LIMIT %s OFFSET %s",
+                [
+                    self.match,
+                    POST_WEIGHT,
+                    COMMENT_WEIGHT,
+                    stop - start,
+                    start,
+                ],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TableBackend:
+    """
+    Инвертированный индекс в модели SearchTerm для баз без FTS5.
+
+    Ранжирует по сумме весов найденных основ.
+    """
+
+    def index(self, post_id, post_terms, comment_terms):
+        weights = Counter()
+        for term in post_terms:
+            weights[term] += POST_WEIGHT
+        for term in comment_terms:
+            weights[term] += COMMENT_WEIGHT
+        self.remove(post_id)
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=post_id, weight=weight)
+            for term, weight in weights.items()
+        )
+
+    def remove(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def ranked_ids(self, query_terms):
+        return (
+            SearchTerm.objects.filter(term__in=query_terms)
+            .values("post")
+            .annotate(matched=Count("pk"), score=Sum("weight"))
+            .filter(matched=len(query_terms))
+            .order_by("-score", "-post")
+            .values_list("post", flat=True)
+        )
+
+    def matching_ids(self, query_terms):
+        return self.ranked_ids(query_terms).order_by()
+
+
+def _fts_available():
+    if connection.vendor != "sqlite":
+        return False
+    name = connection.settings_dict["NAME"]
+    if name not in _fts_tables:
+        # Таблицу создает миграция, если SQLite собран с FTS5.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = %s",
+                [FTS_TABLE],
+            )
+            _fts_tables[name] = cursor.fetchone() is not None
+    return _fts_tables[name]
+
+
+def backend():
+    if settings.SEARCH_BACKEND == "fts5" and _fts_available():
+        return FtsBackend()
+    return TableBackend()
+
+
+def index_post(post_id):
+    """Переиндексирует текст поста и комментариев к нему."""
+    text = (
+        Post.objects.filter(pk=post_id).values_list("text", flat=True).first()
+    )
+    if text is None:
+        backend().remove(post_id)
+        return
+    comment_terms = []
+    for comment in Comment.objects.filter(post_id=post_id).values_list(
+        "text", flat=True
+    ):
+        comment_terms.extend(terms(comment))
+    backend().index(post_id, terms(text), comment_terms)
+
+
+def _flush():
+    post_ids = getattr(_pending, "post_ids", set())
+    _pending.post_ids = set()
+    for post_id in post_ids:
+        index_post(post_id)
+
+
+def schedule(post_id):
+    """
+    Переиндексирует пост после фиксации транзакции.
+
+    Несколько изменений поста в одной транзакции, например удаление всех
+    его комментариев, дают одну переиндексацию.
+    """
+    if not hasattr(_pending, "post_ids"):
+        _pending.post_ids = set()
+    _pending.post_ids.add(post_id)
+    transaction.on_commit(_flush)
+
+
+def rebuild():
+    """Строит индекс заново по всем постам."""
+    index = backend()
+    index.clear()
+    posts = Post.objects.order_by("pk").values_list("pk", "text")
+    last_pk = 0
+    while True:
+        # Посты и комментарии к ним читаются пачками, каждая пачка
+        # индексируется одной транзакцией.
+        chunk = list(posts.filter(pk__gt=last_pk)[:REBUILD_BATCH_SIZE])
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+        comment_terms = defaultdict(list)
+        for post_id, text in Comment.objects.filter(
+            post_id__in=[post_id for post_id, _ in chunk]
+        ).values_list("post_id", "text"):
+            comment_terms[post_id].extend(terms(text))
+        with transaction.atomic():
+            for post_id, text in chunk:
+                index.index(post_id, terms(text), comment_terms[post_id])
+
+
+def matching(query):
+    """Подзапрос id постов, содержащих все слова query."""
+    query_terms = _query_terms(query)
+    if not query_terms:
+        return Post.objects.none().values("pk")
+    return backend().matching_ids(query_terms)
+
+
+def paginate_results(request, query):
+    """Страница найденных постов, от более релевантных к менее."""
+    query_terms = _query_terms(query)
+    ids = backend().ranked_ids(query_terms) if query_terms else []
+    page_obj = get_page(
+        Paginator(ids, settings.PAGE_LIMIT), request.GET.get("page")
+    )
+    posts = Post.objects.select_related("author", "group").in_bulk(
+        list(page_obj.object_list)
+    )
+    page_obj.object_list = [
+        posts[post_id] for post_id in page_obj.object_list if post_id in posts
+    ]
+    return page_obj
@@ -0,0 +1,284 @@
+"""
+Генератор правдоподобных данных для нагрузочных тестов.
+
+Популярность авторов и групп распределена по закону Ципфа: немногие
+авторы собирают большую часть подписчиков, пишут больше постов и чаще
+получают комментарии. Посты выходят сериями за короткое время,
+комментарии образуют ветки под постами.
+"""
+import random
+import time
+from array import array
+from bisect import bisect
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+from itertools import count as count_from
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+from posts.models import Comment, Follow, Group, Post, User
+
+from .transfer import bulk_create_dated, rebuild_derived
+
+# Доля постов без группы.
+NO_GROUP_SHARE = 0.3
+# Средняя длина серии постов и пауза между ними в секундах.
+BURST_LENGTH = 4
+BURST_GAP = 10 * 60
+# Средняя длина ветки комментариев, пауза между ответами и доля ответов
+# автора поста.
+THREAD_LENGTH = 4
+THREAD_GAP = 60 * 60
+AUTHOR_REPLY_SHARE = 0.25
+# Показатель Парето для числа подписок одного пользователя.
+FOLLOWING_SHAPE = 2
+TEXT_POOL_SIZE = 2000
+IMAGE_POOL_SIZE = 16
+IMAGE_SIZE = (1920, 678)
+
+
+def zipf_cum_weights(count, exponent):
+    """Накопленные веса Ципфа для элементов 0..count-1."""
+    return list(
+        accumulate(1 / (rank + 1) ** exponent for rank in range(count))
+    )
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+class Seeder:
+    """
+    Создает users пользователей, groups групп, posts постов и comments
+    комментариев; в среднем follows подписок на пользователя.
+
+    Доля images постов получает картинку из небольшого общего набора.
+    Все пользователи получают пароль password. Записи добавляются к уже
+    существующим пачками по batch_size, одинаковый seed дает одинаковые
+    данные.
+    """
+
+    def __init__(
+        self,
+        users=10_000,
+        groups=100,
+        posts=100_000,
+        comments=100_000,
+        follows=50,
+        images=0.0,
+        days=365,
+        exponent=1.0,
+        password="password",
+        batch_size=1000,
+        seed=2022,
+        report=None,
+    ):
+        self.counts = {
+            "users": users,
+            "groups": groups,
+            "posts": posts,
+            "comments": comments,
+        }
+        self.follows = follows
+        self.images = images
+        self.exponent = exponent
+        self.password = password
+        self.batch_size = batch_size
+        self.report = report
+        self.random = random.Random(seed)
+        self.fake = Faker("ru_RU")
+        self.fake.seed_instance(seed)
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=days)
+        self.period = days * 24 * 60 * 60
+        self.rows = {}
+        self.seconds = {}
+
+    def _choose(self, first_pk, cum_weights):
+        index = bisect(cum_weights, self.random.random() * cum_weights[-1])
+        return first_pk + min(index, len(cum_weights) - 1)
+
+    def _date(self, seconds):
+        """Дата через seconds секунд от начала периода, не позже текущей."""
+        return min(self.start + timedelta(seconds=seconds), self.now)
+
+    def _save(self, name, model, objs):
+        objs = iter(objs)
+        batch = list(islice(objs, self.batch_size))
+        while batch:
+            started = time.perf_counter()
+            # Записи, конфликтующие с уже существующими, не вставляются.
+            inserted = bulk_create_dated(model, batch)
+            seconds = time.perf_counter() - started
+            self.rows[name] = self.rows.get(name, 0) + inserted
+            self.seconds[name] = self.seconds.get(name, 0) + seconds
+            if self.report is not None:
+                self.report(name, inserted, seconds)
+            batch = list(islice(objs, self.batch_size))
+
+    def _texts(self):
+        return [
+            self.fake.sentence(nb_words=self.random.randint(4, 14))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+
+    def _users(self):
+        # Хэш пароля считается один раз: на миллионах записей это минуты.
+        password = make_password(self.password)
+        for i in range(self.counts["users"]):
+            pk = self.first_user + i
+            yield User(
+                pk=pk,
+                username=f"{self.fake.user_name()}_{pk}",
+                password=password,
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                date_joined=self.start,
+            )
+
+    def _groups(self):
+        for i in range(self.counts["groups"]):
+            pk = self.first_group + i
+            yield Group(
+                pk=pk,
+                title=f"{self.fake.word().capitalize()} {pk}",
+                slug=f"group-{pk}",
+                description=self.fake.sentence(),
+            )
+
+    def _images(self):
+        names = []
+        for i in range(IMAGE_POOL_SIZE):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new("RGB", IMAGE_SIZE, color).save(buffer, "JPEG")
+            names.append(
+                default_storage.save(
+                    f"posts/seed_{i}.jpg", ContentFile(buffer.getvalue())
+                )
+            )
+        return names
+
+    def _posts(self, texts, images):
+        users = zipf_cum_weights(self.counts["users"], self.exponent)
+        groups = zipf_cum_weights(self.counts["groups"], self.exponent)
+        pk = self.first_post
+        last_pk = pk + self.counts["posts"]
+        while pk < last_pk:
+            author = self._choose(self.first_user, users)
+            group = None
+            if groups and self.random.random() >= NO_GROUP_SHARE:
+                group = self._choose(self.first_group, groups)
+            seconds = self.random.random() * self.period
+            burst = 1 + int(self.random.expovariate(1 / BURST_LENGTH))
+            stop = min(pk + burst, last_pk)
+            for post_pk in range(pk, stop):
+                seconds += self.random.expovariate(1 / BURST_GAP)
+                pub_date = self._date(seconds)
+                self.posts[author].append(post_pk)
+                self.post_seconds.append(seconds)
+                image = None
+                if images and self.random.random() < self.images:
+                    image = self.random.choice(images)
+                yield Post(
+                    pk=post_pk,
+                    text=" ".join(
+                        self.random.choices(texts, k=self.random.randint(1, 6))
+                    ),
+                    author_id=author,
+                    group_id=group,
+                    image=image,
+                    pub_date=pub_date,
+                    created=pub_date,
+                )
+            pk = stop
+
+    def _follows(self):
+        count = self.counts["users"]
+        users = zipf_cum_weights(count, self.exponent)
+        # Среднее распределения Парето: shape * scale / (shape - 1).
+        scale = self.follows * (FOLLOWING_SHAPE - 1) / FOLLOWING_SHAPE
+        pks = count_from(_next_pk(Follow))
+        for user in range(self.first_user, self.first_user + count):
+            following = min(
+                count - 1,
+                int(self.random.paretovariate(FOLLOWING_SHAPE) * scale),
+            )
+            # Повторы популярных авторов добираются новыми попытками.
+            authors = set()
+            for _ in range(following * 4):
+                if len(authors) >= following:
+                    break
+                authors.add(self._choose(self.first_user, users))
+                authors.discard(user)
+            created = self._date(self.random.random() * self.period)
+            for author in sorted(authors):
+                yield Follow(
+                    pk=next(pks),
+                    user_id=user,
+                    author_id=author,
+                    created=created,
+                )
+
+    def _comments(self, texts):
+        users = zipf_cum_weights(self.counts["users"], self.exponent)
+        remaining = self.counts["comments"]
+        pks = count_from(_next_pk(Comment))
+        while remaining > 0:
+            author = self._choose(self.first_user, users)
+            posts = self.posts.get(author)
+            if not posts:
+                continue
+            post = self.random.choice(posts)
+            seconds = self.post_seconds[post - self.first_post]
+            thread = 1 + int(self.random.expovariate(1 / THREAD_LENGTH))
+            for _ in range(min(thread, remaining)):
+                seconds += self.random.expovariate(1 / THREAD_GAP)
+                commenter = author
+                if self.random.random() >= AUTHOR_REPLY_SHARE:
+                    commenter = self.first_user + self.random.randrange(
+                        self.counts["users"]
+                    )
+                yield Comment(
+                    pk=next(pks),
+                    post_id=post,
+                    author_id=commenter,
+                    text=self.random.choice(texts),
+                    created=self._date(seconds),
+                )
+                remaining -= 1
+
+    def run(self, workers=4):
+        """Создает данные и возвращает общее время в секундах."""
+        started = time.perf_counter()
+        self.first_user = _next_pk(User)
+        self.first_group = _next_pk(Group)
+        self.first_post = _next_pk(Post)
+        # Id постов каждого автора и время их публикации для веток
+        # комментариев.
+        self.posts = defaultdict(lambda: array("q"))
+        self.post_seconds = array("d")
+        texts = self._texts()
+        images = self._images() if self.images else []
+        self._save("users", User, self._users())
+        self._save("groups", Group, self._groups())
+        if self.counts["users"]:
+            self._save("posts", Post, self._posts(texts, images))
+            self._save("follows", Follow, self._follows())
+            if self.counts["posts"]:
+                self._save("comments", Comment, self._comments(texts))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="seed"
+        ) as executor:
+            rebuild_derived(executor, self.batch_size, bool(images))
+        return time.perf_counter() - started
@@ -0,0 +1,205 @@
+from django.conf import settings
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from posts.models import Comment, Follow, Group, Post, User, UserCounters
+
+from . import counters, recommendations, search, thumbnails, timeline
+from .caching import (
+    GLOBAL_SCOPE,
+    author_scope,
+    bump_versions,
+    group_scope,
+    post_scope,
+    post_scopes,
+)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created and settings.FOLLOW_TIMELINE:
+        timeline.add_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, **kwargs):
+    if created and settings.FOLLOW_TIMELINE:
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    if settings.FOLLOW_TIMELINE:
+        timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_group(sender, instance, **kwargs):
+    instance._previous_group = (None, None)
+    if instance.pk:
+        instance._previous_group = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("group_id", "group__slug")
+            .first()
+        ) or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance, **kwargs):
+    scopes = post_scopes(instance)
+    _, previous_slug = getattr(instance, "_previous_group", (None, None))
+    if previous_slug:
+        scopes.append(group_scope(previous_slug))
+    bump_versions(*scopes)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    bump_versions(*post_scopes(instance))
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_group_authors(sender, instance, **kwargs):
+    # Посты группы останутся без нее: меняются страницы их авторов.
+    usernames = (
+        instance.posts.values_list("author__username", flat=True)
+        .order_by()
+        .distinct()
+    )
+    bump_versions(*(author_scope(username) for username in usernames))
+
+
+@receiver(pre_save, sender=Group)
+def remember_previous_slug(sender, instance, **kwargs):
+    instance._previous_slug_title = (None, None)
+    if instance.pk:
+        instance._previous_slug_title = (
+            Group.objects.filter(pk=instance.pk)
+            .values_list("slug", "title")
+            .first()
+        ) or (None, None)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_saved_group(sender, instance, created, **kwargs):
+    scopes = [GLOBAL_SCOPE, group_scope(instance.slug)]
+    previous_slug, previous_title = getattr(
+        instance, "_previous_slug_title", (None, None)
+    )
+    if previous_slug and previous_slug != instance.slug:
+        # Страница по прежнему адресу должна отвечать 404, а не копией.
+        scopes.append(group_scope(previous_slug))
+    if not created and (instance.slug, instance.title) != (
+        previous_slug,
+        previous_title,
+    ):
+        # Название и ссылка группы выводятся в постах и профилях авторов.
+        posts = instance.posts.values_list("pk", "author__username")
+        for post_id, username in posts.iterator():
+            scopes += [post_scope(post_id), author_scope(username)]
+    bump_versions(*scopes)
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_deleted_group(sender, instance, **kwargs):
+    bump_versions(GLOBAL_SCOPE, group_scope(instance.slug))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_post(sender, instance, **kwargs):
+    bump_versions(post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_profile(sender, instance, **kwargs):
+    # Меняются число подписчиков автора и число подписок подписчика.
+    bump_versions(
+        author_scope(instance.author.username),
+        author_scope(instance.user.username),
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_suggestions(sender, instance, **kwargs):
+    recommendations.forget(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance, created, **kwargs):
+    if created:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, "posts_count", 1)
+        counters.change_group_counter(instance.group_id, 1)
+        return
+    previous_id, _ = getattr(instance, "_previous_group", (None, None))
+    if previous_id != instance.group_id:
+        counters.change_group_counter(previous_id, -1)
+        counters.change_group_counter(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, "posts_count", -1)
+    counters.change_group_counter(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_counter(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments_counter(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(instance.user_id, "following_count", 1)
+        counters.change_user_counter(instance.author_id, "followers_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_user_counter(instance.user_id, "following_count", -1)
+    counters.change_user_counter(instance.author_id, "followers_count", -1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_image_upload(sender, instance, **kwargs):
+    # Новый файл сохраняется в хранилище позже, при записи поля.
+    instance._image_uploaded = bool(
+        instance.image and not instance.image._committed
+    )
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, **kwargs):
+    if getattr(instance, "_image_uploaded", False):
+        thumbnails.schedule(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.schedule(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def index_comment_post(sender, instance, **kwargs):
+    search.schedule(instance.post_id)
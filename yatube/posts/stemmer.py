@@ -0,0 +1,118 @@
+"""Стеммер русского языка по алгоритму Snowball (Портер)."""
+from functools import lru_cache
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND_1 = ("в", "вши", "вшись")
+PERFECTIVE_GERUND_2 = ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись")
+REFLEXIVE = ("ся", "сь")
+ADJECTIVE = (
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем",
+    "им", "ым", "ом", "его", "ого", "ему", "ому", "их", "ых", "ую", "юю",
+    "ая", "яя", "ою", "ею",
+)  # fmt: skip
+PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")
+PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+VERB_1 = (
+    "ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет",
+    "ют", "ны", "ть", "ешь", "нно",
+)  # fmt: skip
+VERB_2 = (
+    "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй",
+    "ил", "ыл", "им", "ым", "ен", "ило", "ыло", "ено", "ят", "ует", "уют",
+    "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю",
+)  # fmt: skip
+NOUN = (
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии",
+    "и", "ией", "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам",
+    "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия",
+    "ья", "я",
+)  # fmt: skip
+SUPERLATIVE = ("ейш", "ейше")
+DERIVATIONAL = ("ост", "ость")
+
+
+def _longest_first(*groups):
+    return sorted({e for group in groups for e in group}, key=len)[::-1]
+
+
+_GERUND = _longest_first(PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+_ADJECTIVE = _longest_first(ADJECTIVE)
+_PARTICIPLE = _longest_first(PARTICIPLE_1, PARTICIPLE_2)
+_VERB = _longest_first(VERB_1, VERB_2)
+_NOUN = _longest_first(NOUN)
+_SUPERLATIVE = _longest_first(SUPERLATIVE)
+_DERIVATIONAL = _longest_first(DERIVATIONAL)
+
+
+def _strip(word, endings, after_a=()):
+    """
+    Удаляет самое длинное подходящее окончание или возвращает None.
+
+    Окончания из after_a удаляются, только если перед ними стоит «а» или «я».
+    """
+    for ending in endings:
+        if not word.endswith(ending):
+            continue
+        stripped = word[: -len(ending)]
+        if ending in after_a and not stripped.endswith(("а", "я")):
+            continue
+        return stripped
+    return None
+
+
+def _region(word, start):
+    """Начало области после первой согласной, следующей за гласной."""
+    for i in range(max(start, 1), len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+# Словарь текстов ограничен, а стемминг слова — десятки проверок
+# окончаний: основы частых слов запоминаются.
+@lru_cache(maxsize=100_000)
+def stem(word):
+    word = word.lower().replace("ё", "е")
+    rv_start = next(
+        (i + 1 for i, char in enumerate(word) if char in VOWELS), len(word)
+    )
+    r2_start = _region(word, _region(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1: деепричастие, иначе возвратность и прилагательное, глагол
+    # или существительное.
+    stripped = _strip(rv, _GERUND, PERFECTIVE_GERUND_1)
+    if stripped is None:
+        reflexive = _strip(rv, REFLEXIVE)
+        rv = rv if reflexive is None else reflexive
+        stripped = _strip(rv, _ADJECTIVE)
+        if stripped is not None:
+            participle = _strip(stripped, _PARTICIPLE, PARTICIPLE_1)
+            stripped = stripped if participle is None else participle
+        else:
+            stripped = _strip(rv, _VERB, VERB_1)
+            if stripped is None:
+                stripped = _strip(rv, _NOUN)
+    if stripped is not None:
+        rv = stripped
+
+    # Шаг 2.
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательный суффикс в области R2.
+    stripped = _strip(rv, _DERIVATIONAL)
+    if stripped is not None and rv_start + len(stripped) >= r2_start:
+        rv = stripped
+
+    # Шаг 4.
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        stripped = _strip(rv, _SUPERLATIVE)
+        if stripped is not None:
+            rv = stripped[:-1] if stripped.endswith("нн") else stripped
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return prefix + rv
@@ -0,0 +1,44 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from posts.caching import cached_fragment, post_scope
+
+register = template.Library()
+
+# Страницы, на которых в карточке поста выводится автор.
+SHOW_AUTHOR_VIEWS = (
+    "posts:index",
+    "posts:popular",
+    "posts:group_list",
+    "posts:search",
+)
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """
+    Карточка поста из кэша фрагментов.
+
+    Карточка не зависит от пользователя и устаревает при изменении поста
+    (версия области post:<id>), автора или группы.
+    """
+    match = getattr(context.get("request"), "resolver_match", None)
+    show_author = getattr(match, "view_name", None) in SHOW_AUTHOR_VIEWS
+    author = post.author
+    vary_on = (
+        post.pk,
+        show_author,
+        author.username,
+        author.get_full_name(),
+        post.group.slug if post.group_id else None,
+    )
+    html = cached_fragment(
+        "post_card",
+        [post_scope(post.pk)],
+        vary_on,
+        lambda: render_to_string(
+            "posts/includes/post_card.html",
+            {"post": post, "show_author": show_author},
+        ),
+    )
+    return mark_safe(html)
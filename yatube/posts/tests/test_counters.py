@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from posts.models import Comment, Follow, Group, Post, User, UserCounters
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user")
+        cls.author = User.objects.create_user(username="author")
+        cls.group_1 = Group.objects.create(
+            title="Тестовая группа 1",
+            slug="test1",
+            description="Тестовое описание",
+        )
+        cls.group_2 = Group.objects.create(
+            title="Тестовая группа 2",
+            slug="test2",
+            description="Тестовое описание",
+        )
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_post_counters(self):
+        """
+        Создание, перенос и удаление поста меняют счетчики автора и групп
+        """
+        post = Post.objects.create(
+            text="Тестовый пост", author=self.author, group=self.group_1
+        )
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.group_1.refresh_from_db()
+        self.assertEqual(self.group_1.posts_count, 1)
+
+        post.group = self.group_2
+        post.save()
+        self.group_1.refresh_from_db()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.group_1.posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 1)
+
+        post.delete()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 0)
+
+    def test_comment_counter(self):
+        """
+        Комментарии меняют счетчик поста
+        """
+        post = Post.objects.create(text="Тестовый пост", author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.user, text="Комментарий"
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """
+        Подписка и отписка меняют счетчики подписчика и автора
+        """
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.counters(self.user).following_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertEqual(self.counters(self.user).following_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+
+    def test_reconcile_command(self):
+        """
+        Команда reconcile_counters исправляет расхождения
+        """
+        post = Post.objects.create(
+            text="Тестовый пост", author=self.author, group=self.group_1
+        )
+        Comment.objects.create(post=post, author=self.user, text="Текст")
+        Follow.objects.create(user=self.user, author=self.author)
+        UserCounters.objects.update(
+            posts_count=7, followers_count=7, following_count=7
+        )
+        Group.objects.update(posts_count=7)
+        Post.objects.update(comments_count=7)
+        UserCounters.objects.filter(user=self.user).delete()
+
+        call_command("reconcile_counters", stdout=StringIO())
+
+        author_counters = self.counters(self.author)
+        self.assertEqual(author_counters.posts_count, 1)
+        self.assertEqual(author_counters.followers_count, 1)
+        self.assertEqual(author_counters.following_count, 0)
+        self.assertEqual(self.counters(self.user).following_count, 1)
+        self.group_1.refresh_from_db()
+        self.assertEqual(self.group_1.posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
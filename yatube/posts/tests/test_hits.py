@@ -0,0 +1,89 @@
+from collections import Counter
+from unittest import mock
+
+from core import stats
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import hits
+from posts.models import Post, User
+
+
+class HitsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.posts = [
+            Post.objects.create(text=f"Пост {i}", author=cls.author)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        # Свой буфер: без просмотров из других тестов.
+        patcher = mock.patch.object(hits, "_buffer", Counter())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_views_buffered_until_flush(self):
+        """
+        Просмотры копятся в памяти и записываются при сбросе
+        """
+        post = self.posts[0]
+        url = reverse("posts:post_detail", args=(post.pk,))
+        for _ in range(3):
+            self.client.get(url)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 0)
+        self.assertEqual(hits.pending(), {post.pk: 3})
+
+        self.assertEqual(hits.flush(), 3)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 3)
+        self.assertEqual(hits.pending(), {})
+
+    def test_flush_groups_updates_by_delta(self):
+        """
+        Посты с одинаковым числом просмотров обновляются одним запросом
+        """
+        for post in self.posts:
+            hits.record(post.pk)
+        hits.record(self.posts[0].pk)
+        with CaptureQueriesContext(connection) as captured:
+            hits.flush()
+        updates = [
+            query for query in captured if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(
+            list(Post.objects.order_by("pk").values_list("views", flat=True)),
+            [2, 1, 1],
+        )
+
+    @override_settings(HITS_BUFFER_SIZE=1)
+    def test_full_buffer_drops_new_posts(self):
+        """
+        Просмотры постов сверх размера буфера отбрасываются
+        """
+        dropped = stats.snapshot().get("hits.dropped", 0)
+        hits.record(self.posts[0].pk)
+        hits.record(self.posts[0].pk)
+        hits.record(self.posts[1].pk)
+        self.assertEqual(hits.pending(), {self.posts[0].pk: 2})
+        self.assertEqual(stats.snapshot()["hits.dropped"], dropped + 1)
+
+    @override_settings(HITS_FLUSH_INTERVAL=0)
+    def test_background_flush_scheduled(self):
+        """
+        По истечении интервала сброс уходит в фоновый поток один раз
+        """
+        with mock.patch.object(
+            hits, "_background_allowed", return_value=True
+        ), mock.patch.object(hits, "_flushing", False), mock.patch.object(
+            hits, "_get_executor"
+        ) as executor:
+            hits.record(self.posts[0].pk)
+            hits.record(self.posts[0].pk)
+        executor.return_value.submit.assert_called_once_with(hits._run)
+        self.assertEqual(hits.pending(), {self.posts[0].pk: 2})
@@ -0,0 +1,102 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import ranking, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+
+@override_settings(PAGE_LIMIT=2, COMMENTS_PAGE_LIMIT=2)
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test",
+            description="Тестовое описание",
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.bulk_create(
+            Post(text=f"Пост {i}", author=cls.author, group=cls.group)
+            for i in range(5)
+        )
+        cls.post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.reader, text=f"Комментарий {i}")
+            for i in range(5)
+        )
+        timeline.rebuild(cls.reader.pk)
+        ranking.refresh()
+        cls.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": cls.group.slug}),
+            reverse("posts:profile", kwargs={"username": "author"}),
+            reverse("posts:post_detail", kwargs={"post_id": cls.post.pk}),
+            reverse("posts:popular"),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def get(self, url):
+        # Страницы лент кэшируются, запросы нужны при каждом обращении.
+        cache.clear()
+        return self.client.get(url)
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(url).status_code, 200)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT"):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plans[sql] = [row[-1] for row in cursor.fetchall()]
+        return plans
+
+    def assertIndexed(self, url):
+        for sql, plan in self.query_plans(url).items():
+            for step in plan:
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertNotIn("TEMP B-TREE", step)
+                    if step.startswith("SCAN"):
+                        self.assertIn("USING", step)
+
+    def test_page_mode(self):
+        """
+        Ленты и страница поста читаются по индексам без сортировки
+        """
+        for url in self.urls:
+            self.assertIndexed(url)
+            self.assertIndexed(url + "?page=2")
+
+    def test_cursor_mode(self):
+        """
+        Курсорная пагинация идет по индексам в обе стороны
+        """
+        for url in self.urls[:3]:
+            response = self.get(url + "?cursor=")
+            next_cursor = response.context["page_obj"].next_cursor
+            self.assertIndexed(url + "?cursor=" + next_cursor)
+            response = self.get(url + "?cursor=" + next_cursor)
+            previous_cursor = response.context["page_obj"].previous_cursor
+            self.assertIndexed(url + "?cursor=" + previous_cursor)
+
+    @override_settings(FOLLOW_TIMELINE=True)
+    def test_follow_timeline(self):
+        """
+        Персональная лента читается по индексу timeline_user_pub_date
+        """
+        url = reverse("posts:follow_index")
+        self.assertIndexed(url)
+        response = self.get(url + "?cursor=")
+        page_obj = response.context["page_obj"]
+        self.assertEqual(len(page_obj), 2)
+        self.assertIsInstance(page_obj[0], Post)
+        self.assertIndexed(url + "?cursor=" + page_obj.next_cursor)
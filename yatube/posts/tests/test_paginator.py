@@ -1,6 +1,8 @@
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
 from posts.models import Group, Post, User
+from posts.utils import page_window
 
 
 class PaginatorViewsTest(TestCase):
@@ -53,3 +55,116 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(
                     len(response.context.get("page_obj").object_list), 3
                 )
+
+    @override_settings(PAGE_LIMIT=1, PAGE_WINDOW_RADIUS=1)
+    def test_page_window(self):
+        """
+        Проверка: навигация выводит только окно номеров страниц
+        """
+        response = self.guest_client.get(self.urls[0] + "?page=7")
+        self.assertEqual(
+            response.context.get("page_obj").window,
+            [1, None, 6, 7, 8, None, 13],
+        )
+        self.assertContains(response, "?page=6")
+        self.assertContains(response, "?page=13")
+        self.assertNotContains(response, "?page=5")
+        self.assertContains(response, "…", count=2)
+
+
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test",
+            description="Тестовое описание",
+        )
+        Post.objects.bulk_create(
+            [
+                Post(
+                    text=f"Тестовый пост номер{str(i)}",
+                    author=cls.user,
+                    group=cls.group,
+                )
+                for i in range(13)
+            ]
+        )
+        cls.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": cls.group.slug}),
+            reverse("posts:profile", kwargs={"username": cls.user.username}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_cursor_pages(self):
+        """
+        Проверка: курсоры ведут на следующую и предыдущую страницы
+        """
+        for address in self.urls:
+            with self.subTest(address=address):
+                first = self.guest_client.get(address + "?cursor=")
+                first_page = first.context.get("page_obj")
+                self.assertEqual(len(first_page), 10)
+                self.assertFalse(first_page.has_previous())
+                self.assertTrue(first_page.has_next())
+
+                second = self.guest_client.get(
+                    address + "?cursor=" + first_page.next_cursor
+                )
+                second_page = second.context.get("page_obj")
+                self.assertEqual(len(second_page), 3)
+                self.assertFalse(second_page.has_next())
+                self.assertTrue(set(first_page).isdisjoint(second_page))
+
+                back = self.guest_client.get(
+                    address + "?cursor=" + second_page.previous_cursor
+                )
+                self.assertEqual(
+                    list(back.context.get("page_obj")), list(first_page)
+                )
+
+    def test_broken_cursor_opens_first_page(self):
+        """
+        Проверка: поврежденный курсор открывает первую страницу
+        """
+        response = self.guest_client.get(self.urls[0] + "?cursor=broken")
+        page_obj = response.context.get("page_obj")
+        self.assertEqual(len(page_obj), 10)
+        self.assertFalse(page_obj.has_previous())
+
+    @override_settings(PAGINATION_MODE="cursor")
+    def test_cursor_mode_setting(self):
+        """
+        Проверка: в режиме cursor шаблон выводит ссылки на курсоры
+        """
+        response = self.guest_client.get(self.urls[1])
+        page_obj = response.context.get("page_obj")
+        self.assertTrue(page_obj.cursor_mode)
+        self.assertContains(response, "?cursor=" + page_obj.next_cursor)
+        self.assertNotContains(response, "?page=")
+
+
+class PageWindowTest(SimpleTestCase):
+    def test_window(self):
+        """
+        Проверка: окно номеров вокруг текущей страницы с пропусками
+        """
+        cases = (
+            (1, 1, [1]),
+            (1, 6, [1, 2, 3, 4, 5, 6]),
+            (1, 8, [1, 2, 3, 4, None, 8]),
+            (1, 100, [1, 2, 3, 4, None, 100]),
+            (50, 100, [1, None, 47, 48, 49, 50, 51, 52, 53, None, 100]),
+            (100, 100, [1, None, 97, 98, 99, 100]),
+            # Пропуск из одной страницы заменяется ее номером.
+            (5, 100, [1, 2, 3, 4, 5, 6, 7, 8, None, 100]),
+        )
+        for number, num_pages, window in cases:
+            with self.subTest(number=number, num_pages=num_pages):
+                self.assertEqual(page_window(number, num_pages, 3), window)
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts import ranking
+from posts.models import Comment, Follow, Post, PostRank, User
+
+
+@override_settings(
+    POPULAR_WEIGHTS={"comments": 1.0, "followers": 1.0, "views": 0.5},
+    POPULAR_HALF_LIFE=24,
+)
+class RankingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        now = timezone.now()
+        cls.old = Post.objects.create(text="Старый пост", author=cls.author)
+        cls.new = Post.objects.create(text="Новый пост", author=cls.author)
+        # Старый пост опубликован на сутки раньше нового.
+        Post.objects.filter(pk=cls.old.pk).update(
+            pub_date=now - timedelta(days=1)
+        )
+        Post.objects.filter(pk=cls.new.pk).update(pub_date=now)
+
+    def setUp(self):
+        cache.clear()
+
+    def order(self):
+        return list(ranking.feed().values_list("post_id", flat=True))
+
+    def test_score_decays_with_age(self):
+        """
+        Вовлеченность теряет половину веса за период полураспада
+        """
+        now = timezone.now()
+        day_ago = now - timedelta(days=1)
+        self.assertAlmostEqual(
+            ranking.score(now, 0, 0, 0), ranking.score(day_ago, 1, 0, 0)
+        )
+        self.assertGreater(
+            ranking.score(day_ago, 3, 0, 0), ranking.score(now, 0, 0, 0)
+        )
+
+    def test_refresh_is_incremental(self):
+        """
+        Повторный пересчет затрагивает только изменившиеся посты
+        """
+        self.assertEqual(ranking.refresh(), 2)
+        self.assertEqual(ranking.refresh(), 0)
+        self.assertEqual(self.order(), [self.new.pk, self.old.pk])
+
+        for i in range(3):
+            Comment.objects.create(
+                post=self.old, author=self.reader, text=f"Комментарий {i}"
+            )
+        self.assertEqual(ranking.refresh(), 1)
+        self.assertEqual(self.order(), [self.old.pk, self.new.pk])
+
+        Post.objects.filter(pk=self.new.pk).update(views=20)
+        self.assertEqual(ranking.refresh(), 1)
+        self.assertEqual(self.order(), [self.new.pk, self.old.pk])
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(ranking.refresh(), 2)
+        self.assertEqual(
+            set(PostRank.objects.values_list("followers", flat=True)), {1}
+        )
+        self.assertEqual(ranking.refresh(full=True), 2)
+
+    def test_popular_page(self):
+        """
+        Лента популярных выводит посты с оценкой в порядке рейтинга
+        """
+        ranking.refresh()
+        unranked = Post.objects.create(text="Без оценки", author=self.author)
+        url = reverse("posts:popular")
+        response = self.client.get(url)
+        self.assertEqual(
+            response.context["page_obj"].object_list, [self.new, self.old]
+        )
+        self.assertNotContains(response, unranked.text)
+
+        # Пересчет сбрасывает кэш ленты.
+        ranking.refresh()
+        response = self.client.get(url)
+        self.assertContains(response, unranked.text)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("rank_posts", stdout=out)
+        self.assertIn("Пересчитано оценок: 2", out.getvalue())
@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import recommendations
+from posts.models import Follow, FollowSuggestion, User
+from posts.recommendations import Graph
+
+
+class GraphTest(TestCase):
+    def test_csr(self):
+        graph = Graph.from_edges([(1, 2), (1, 3), (3, 1)], size=5)
+        self.assertEqual(graph.size, 5)
+        self.assertEqual(list(graph.neighbours(1)), [2, 3])
+        self.assertEqual(list(graph.neighbours(2)), [])
+        followers = graph.transpose()
+        self.assertEqual(list(followers.neighbours(1)), [3])
+        self.assertEqual(list(followers.neighbours(3)), [1])
+
+    def test_neighbours_sampled_evenly(self):
+        graph = Graph.from_edges((0, author) for author in range(1, 101))
+        self.assertEqual(list(graph.neighbours(0, 4)), [1, 26, 51, 76])
+
+
+class RecommendationsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.alice, cls.bob, cls.carol, cls.dave, cls.erin = (
+            User.objects.create_user(username=name)
+            for name in ("alice", "bob", "carol", "dave", "erin")
+        )
+        for user, author in (
+            (cls.alice, cls.bob),
+            (cls.bob, cls.carol),
+            (cls.dave, cls.bob),
+            (cls.dave, cls.erin),
+        ):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.alice)
+
+    def suggested(self, user):
+        return set(
+            FollowSuggestion.objects.filter(user=user).values_list(
+                "author__username", flat=True
+            )
+        )
+
+    def test_refresh(self):
+        """
+        Рекомендуются авторы авторов и авторы с общими подписчиками
+        """
+        self.assertEqual(recommendations.refresh(batch_size=2), 2)
+        # carol — автор bob, erin читают вместе с bob.
+        self.assertEqual(self.suggested(self.alice), {"carol", "erin"})
+        self.assertEqual(self.suggested(self.dave), {"carol"})
+        self.assertEqual(self.suggested(self.bob), set())
+
+        Follow.objects.filter(user=self.alice).delete()
+        recommendations.refresh()
+        self.assertEqual(self.suggested(self.alice), set())
+
+    def test_pages(self):
+        """
+        Рекомендации выводятся в подписках и профилях без уже читаемых
+        авторов и профиля, который открыт
+        """
+        recommendations.refresh()
+        carol_url = reverse("posts:profile", args=("carol",))
+        erin_url = reverse("posts:profile", args=("erin",))
+        response = self.client.get(reverse("posts:follow_index"))
+        self.assertContains(response, f'href="{carol_url}"')
+        self.assertContains(response, f'href="{erin_url}"')
+
+        response = self.client.get(carol_url)
+        self.assertNotContains(response, f'href="{carol_url}"')
+        self.assertContains(response, f'href="{erin_url}"')
+
+        self.client.get(reverse("posts:profile_follow", args=("erin",)))
+        response = self.client.get(reverse("posts:follow_index"))
+        self.assertNotContains(response, f'href="{erin_url}"')
+
+    def test_profile_revalidated(self):
+        """
+        Профиль с прежними рекомендациями не отдается как 304 после
+        пересчета и после подписки пользователя
+        """
+        recommendations.refresh()
+        url = reverse("posts:profile", args=("carol",))
+        erin_url = reverse("posts:profile", args=("erin",))
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        recommendations.refresh()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        self.client.get(reverse("posts:profile_follow", args=("erin",)))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, f'href="{erin_url}"')
+
+    def test_cached_until_refresh(self):
+        recommendations.refresh()
+        recommendations.suggestions(self.alice)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(recommendations.suggestions(self.alice)), 2)
+        frank = User.objects.create_user(username="frank")
+        Follow.objects.create(user=self.bob, author=frank)
+        self.assertEqual(len(recommendations.suggestions(self.alice)), 2)
+        recommendations.refresh()
+        self.assertEqual(len(recommendations.suggestions(self.alice)), 3)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("recommend_authors", stdout=out)
+        self.assertIn("Рекомендации для 2 пользователей", out.getvalue())
@@ -0,0 +1,131 @@
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from posts import search
+from posts.models import Comment, Post, User
+from posts.stemmer import stem
+
+
+class StemmerTest(SimpleTestCase):
+    def test_word_forms(self):
+        """
+        Разные формы слова сводятся к одной основе
+        """
+        for forms in (
+            ("пост", "посты", "постов", "постами"),
+            ("красивая", "красивые", "красивыми", "красивый"),
+            ("читать", "читаешь", "читает"),
+            ("ёлка", "елки", "елкой"),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(word) for word in forms}), 1)
+
+    def test_terms(self):
+        """
+        Текст разбивается на основы без знаков препинания
+        """
+        self.assertEqual(
+            search.terms("Новые посты, Django 2.2!"),
+            ["нов", "пост", "django", "2", "2"],
+        )
+
+
+class SearchMixin:
+    def setUp(self):
+        # Таблицу FTS5 не очищает сброс базы между тестами.
+        search.rebuild()
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+        self.post = Post.objects.create(
+            text="Красивые фотографии летнего леса", author=self.author
+        )
+        self.commented = Post.objects.create(
+            text="Прогулка по городу", author=self.author
+        )
+        self.comment = Comment.objects.create(
+            post=self.commented,
+            author=self.reader,
+            text="Какой красивый город!",
+        )
+
+    def found(self, query):
+        response = self.client.get(reverse("posts:search"), {"q": query})
+        return list(response.context["page_obj"])
+
+    def test_search_by_word_form(self):
+        """
+        Пост находится по другой форме слова из текста
+        """
+        self.assertEqual(self.found("фотография лес"), [self.post])
+
+    def test_comments_rank_lower(self):
+        """
+        Совпадение в тексте поста выше совпадения в комментарии
+        """
+        self.assertEqual(self.found("красивая"), [self.post, self.commented])
+
+    def test_index_follows_changes(self):
+        """
+        Индекс обновляется при изменении и удалении постов и комментариев
+        """
+        self.comment.delete()
+        self.assertEqual(self.found("красивая"), [self.post])
+        self.post.text = "Осенний лес"
+        self.post.save()
+        self.assertEqual(self.found("фотография"), [])
+        self.assertEqual(self.found("осень"), [self.post])
+        self.post.delete()
+        self.assertEqual(self.found("лес"), [])
+
+    def test_empty_query(self):
+        """
+        Пустой запрос и запрос из одних знаков ничего не находят
+        """
+        for query in ("", "  ", "!?"):
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), [])
+
+    def test_pagination_keeps_query(self):
+        """
+        Ссылки пагинатора сохраняют поисковый запрос
+        """
+        Post.objects.bulk_create(
+            Post(text=f"Лес номер {i}", author=self.author) for i in range(11)
+        )
+        search.rebuild()
+        response = self.client.get(reverse("posts:search"), {"q": "лес"})
+        self.assertEqual(response.context["page_obj"].paginator.count, 12)
+        self.assertContains(response, "?q=%D0%BB%D0%B5%D1%81&amp;page=2")
+
+    def test_admin_search(self):
+        """
+        Поиск в админке использует тот же индекс
+        """
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="admin"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"q": "городами"}
+        )
+        self.assertEqual(
+            list(response.context["cl"].result_list), [self.commented]
+        )
+
+
+@override_settings(SEARCH_BACKEND="fts5")
+class FtsSearchTest(SearchMixin, TransactionTestCase):
+    def test_uses_fts(self):
+        """
+        На SQLite с FTS5 используется виртуальная таблица
+        """
+        self.assertIsInstance(search.backend(), search.FtsBackend)
+
+
+@override_settings(SEARCH_BACKEND="table")
+class TableSearchTest(SearchMixin, TransactionTestCase):
+    def test_uses_table(self):
+        """
+        Запасной бэкенд хранит основы в модели SearchTerm
+        """
+        self.assertIsInstance(search.backend(), search.TableBackend)
+        self.assertTrue(self.post.search_terms.filter(term="лес").exists())
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TransactionTestCase, override_settings
+from posts import thumbnails
+from posts.models import Comment, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class SeedTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def seed(self, *args):
+        call_command(
+            "seed",
+            "--users=200",
+            "--groups=10",
+            "--posts=1000",
+            "--comments=500",
+            "--follows=10",
+            "--batch-size=150",
+            *args,
+            stdout=StringIO(),
+        )
+
+    def test_volume_and_counters(self):
+        """
+        Создается заданный объем данных, счетчики пересчитаны
+        """
+        self.seed()
+        self.assertEqual(User.objects.count(), 200)
+        self.assertEqual(Group.objects.count(), 10)
+        self.assertEqual(Post.objects.count(), 1000)
+        self.assertEqual(Comment.objects.count(), 500)
+        author = User.objects.annotate(posts_total=Count("posts")).first()
+        self.assertEqual(author.counters.posts_count, author.posts_total)
+        self.assertTrue(
+            self.client.login(username=author.username, password="password")
+        )
+
+    def test_conflicts_not_counted(self):
+        """
+        Записи, пропущенные из-за конфликта, не входят в отчет
+        """
+        # Группы получат pk 2–4, адрес первой из них уже занят.
+        Group.objects.create(pk=1, title="Занятая", slug="group-2")
+        out = StringIO()
+        call_command(
+            "seed",
+            "--users=0",
+            "--groups=3",
+            "--batch-size=2",
+            stdout=out,
+        )
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertIn("groups: 2 ", out.getvalue())
+
+    def test_power_law_followers(self):
+        """
+        Подписчики сосредоточены у немногих популярных авторов
+        """
+        self.seed()
+        followers = sorted(
+            User.objects.annotate(total=Count("following")).values_list(
+                "total", flat=True
+            ),
+            reverse=True,
+        )
+        top = sum(followers[: len(followers) // 10])
+        self.assertEqual(sum(followers), Follow.objects.count())
+        self.assertGreater(top, sum(followers) / 2)
+
+    def test_posts_spread_over_period(self):
+        """
+        Посты распределены по периоду, а не созданы в момент генерации
+        """
+        self.seed("--days=30")
+        dates = Post.objects.values_list("pub_date", flat=True)
+        self.assertGreater(max(dates) - min(dates), timedelta(days=20))
+
+    def test_same_seed_same_data(self):
+        """
+        Одинаковый seed дает одинаковые данные
+        """
+        posts = Post.objects.order_by("pk").values_list(
+            "text", "author__username", "group__slug"
+        )
+        self.seed()
+        first = list(posts)
+        call_command("flush", interactive=False, verbosity=0)
+        self.seed()
+        self.assertEqual(list(posts), first)
+
+    def test_images(self):
+        """
+        Картинки берутся из общего набора, миниатюры созданы
+        """
+        self.seed("--images=0.5", "--workers=1")
+        post = Post.objects.exclude(image="").first()
+        self.assertIsNotNone(thumbnails.picture(post.image))
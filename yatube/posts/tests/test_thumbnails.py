@@ -0,0 +1,189 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from posts import thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+def small_gif(name="small.gif"):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type="image/gif"
+    )
+
+
+def small_jpeg(name):
+    content = BytesIO()
+    Image.new("RGB", (2, 1), "white").save(content, "JPEG")
+    return SimpleUploadedFile(
+        name=name, content=content.getvalue(), content_type="image/jpeg"
+    )
+
+
+def variant_prefix(image):
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    return f"{stem}_{hashlib.md5(image.name.encode()).hexdigest()[:8]}"
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class ThumbnailPipelineTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user")
+        self.client.force_login(self.user)
+
+    def test_thumbnail_created_on_upload(self):
+        """
+        Варианты картинки создаются после сохранения поста
+        """
+        self.client.post(
+            reverse("posts:create_post"),
+            data={"text": "Пост с картинкой", "image": small_gif()},
+        )
+        post = Post.objects.get()
+        picture = thumbnails.picture(post.image)
+        self.assertIsNotNone(picture)
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, picture["src"])
+        self.assertContains(response, picture["srcset"])
+
+    def test_variants_stored_by_width(self):
+        """
+        Варианты всех ширин лежат в posts/variants под предсказуемыми именами
+        """
+        self.client.post(
+            reverse("posts:create_post"),
+            data={"text": "Пост с картинкой", "image": small_gif()},
+        )
+        image = Post.objects.get().image
+        prefix = variant_prefix(image)
+        variants = os.listdir(
+            os.path.join(TEMP_MEDIA_ROOT, "posts", "variants")
+        )
+        for geometry in ("320x113", "640x226", "960x339", "1920x678"):
+            self.assertIn(f"{prefix}_{geometry}.gif", variants)
+        picture = thumbnails.picture(image)
+        self.assertIn(f"{prefix}_320x113.gif 320w", picture["srcset"])
+        self.assertTrue(picture["src"].endswith(f"{prefix}_960x339.gif"))
+
+    def test_same_stem_variants(self):
+        """
+        У оригиналов с одинаковым именем без расширения свои варианты
+        """
+        for upload in (small_jpeg("photo.jpg"), small_jpeg("photo.jpeg")):
+            self.client.post(
+                reverse("posts:create_post"),
+                data={"text": "Пост с картинкой", "image": upload},
+            )
+        first, second = (
+            thumbnails.picture(post.image)
+            for post in Post.objects.order_by("pk")
+        )
+        self.assertNotEqual(first["src"], second["src"])
+        start = len(settings.MEDIA_URL)
+        for picture in (first, second):
+            name = picture["src"][start:]
+            self.assertTrue(default_storage.exists(name))
+
+    @skipUnless("WEBP" in Image.SAVE, "Pillow собран без поддержки WebP")
+    def test_webp_source(self):
+        """
+        Вариант WebP выводится отдельным source перед оригинальным форматом
+        """
+        self.client.post(
+            reverse("posts:create_post"),
+            data={"text": "Пост с картинкой", "image": small_gif()},
+        )
+        image = Post.objects.get().image
+        source = thumbnails.picture(image)["sources"][0]
+        self.assertEqual(source["type"], "image/webp")
+        self.assertIn(
+            f"{variant_prefix(image)}_640x226.webp 640w", source["srcset"]
+        )
+
+    def test_backfill_command(self):
+        """
+        Команда создает миниатюры картинок, загруженных без них
+        """
+        name = default_storage.save("posts/old.gif", ContentFile(SMALL_GIF))
+        post = Post.objects.create(text="Старый пост", author=self.user)
+        # update не отправляет сигналы, как и посты до появления миниатюр.
+        Post.objects.filter(pk=post.pk).update(image=name)
+        post.refresh_from_db()
+        # У постов без картинки в поле бывает и NULL.
+        empty = Post.objects.create(text="Без картинки", author=self.user)
+        Post.objects.filter(pk=empty.pk).update(image=None)
+        self.assertIsNone(thumbnails.picture(post.image))
+
+        out = StringIO()
+        call_command("generate_thumbnails", stdout=out)
+        self.assertIn("Созданы миниатюры картинок: 1", out.getvalue())
+        self.assertIsNotNone(thumbnails.picture(post.image))
+        call_command("generate_thumbnails", stdout=out)
+        self.assertIn("Созданы миниатюры картинок: 0", out.getvalue())
+
+    def test_thumbnail_created_on_edit(self):
+        """
+        Новая картинка при редактировании тоже получает миниатюру
+        """
+        post = Post.objects.create(text="Пост", author=self.user)
+        self.client.post(
+            reverse("posts:post_edit", kwargs={"post_id": post.pk}),
+            data={"text": "Пост", "image": small_gif()},
+        )
+        post.refresh_from_db()
+        self.assertIsNotNone(thumbnails.picture(post.image))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPlaceholderTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_placeholder_until_ready(self):
+        """
+        Пока варианты не готовы, страница выводит заглушку
+        и не создает их в запросе
+        """
+        user = User.objects.create_user(username="user")
+        # В TestCase транзакция не фиксируется: фоновая задача не запустится.
+        post = Post.objects.create(
+            text="Пост с картинкой", author=user, image=small_gif()
+        )
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotContains(response, settings.MEDIA_URL)
+        self.assertContains(response, "bg-light")
+        self.assertIsNone(thumbnails.picture(post.image))
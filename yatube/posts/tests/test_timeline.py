@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Follow, Post, TimelineEntry, User
+
+
+@override_settings(FOLLOW_TIMELINE=True)
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user")
+        cls.author = User.objects.create_user(username="author")
+        cls.other = User.objects.create_user(username="other")
+        cls.old_post = Post.objects.create(author=cls.author, text="Старый")
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def timeline_posts(self):
+        return set(
+            TimelineEntry.objects.filter(user=self.user).values_list(
+                "post_id", flat=True
+            )
+        )
+
+    def test_follow_fills_timeline(self):
+        """
+        Подписка добавляет в ленту уже опубликованные посты автора
+        """
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.timeline_posts(), {self.old_post.pk})
+
+    def test_new_post_fan_out(self):
+        """
+        Новый пост попадает в ленты подписчиков, но не других пользователей
+        """
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text="Новый")
+        Post.objects.create(author=self.other, text="Чужой")
+        self.assertEqual(self.timeline_posts(), {self.old_post.pk, post.pk})
+
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        self.assertEqual(
+            list(response.context["page_obj"]), [post, self.old_post]
+        )
+
+    def test_unfollow_trims_timeline(self):
+        """
+        Отписка убирает посты автора из ленты
+        """
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=self.other)
+        other_post = Post.objects.create(author=self.other, text="Другой")
+        self.authorized_client.get(
+            reverse(
+                "posts:profile_unfollow",
+                kwargs={"username": self.author.username},
+            )
+        )
+        self.assertEqual(self.timeline_posts(), {other_post.pk})
+
+    def test_rebuild_command(self):
+        """
+        Команда rebuild_timelines восстанавливает ленты подписчиков
+        """
+        with override_settings(FOLLOW_TIMELINE=False):
+            Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.timeline_posts(), set())
+        call_command("rebuild_timelines", stdout=StringIO())
+        self.assertEqual(self.timeline_posts(), {self.old_post.pk})
@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from posts import search, thumbnails, transfer
+from posts.models import Comment, Follow, Group, Post, User
+
+from .test_thumbnails import SMALL_GIF
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SOURCE_MEDIA_ROOT = os.path.join(TEMP_DIR, "source")
+TARGET_MEDIA_ROOT = os.path.join(TEMP_DIR, "target")
+DUMP = os.path.join(TEMP_DIR, "dump.ndjson.gz")
+
+PUB_DATE = datetime(2020, 5, 17, 12, 30, tzinfo=timezone.utc)
+
+
+@override_settings(MEDIA_ROOT=TARGET_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class TransferTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TARGET_MEDIA_ROOT, ignore_errors=True)
+        os.makedirs(os.path.join(SOURCE_MEDIA_ROOT, "posts"), exist_ok=True)
+        with open(
+            os.path.join(SOURCE_MEDIA_ROOT, "posts", "small.gif"), "wb"
+        ) as file:
+            file.write(SMALL_GIF)
+        author = User.objects.create_user(
+            username="author", password="x", is_staff=True, is_superuser=True
+        )
+        reader = User.objects.create_user(username="reader")
+        group = Group.objects.create(title="Группа", slug="group")
+        posts = [
+            Post.objects.create(
+                text=f"Летний лес {i}", author=author, group=group
+            )
+            for i in range(5)
+        ]
+        Post.objects.filter(pk=posts[0].pk).update(
+            pub_date=PUB_DATE, image="posts/small.gif"
+        )
+        Comment.objects.create(post=posts[0], author=reader, text="Ого")
+        Follow.objects.create(user=reader, author=author)
+        self.password = author.password
+        call_command("export_data", DUMP, stdout=StringIO())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        search.rebuild()
+        self.post_id = posts[0].pk
+
+    def import_data(self, *args):
+        call_command(
+            "import_data",
+            DUMP,
+            "--media-root",
+            SOURCE_MEDIA_ROOT,
+            *args,
+            stdout=StringIO(),
+        )
+
+    def assertImported(self):
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        author = User.objects.get(username="author")
+        self.assertEqual(author.password, self.password)
+        self.assertTrue(author.is_staff)
+        self.assertTrue(author.is_superuser)
+        reader = User.objects.get(username="reader")
+        self.assertFalse(reader.is_staff or reader.is_superuser)
+
+    def test_round_trip(self):
+        """
+        Импорт восстанавливает записи, даты, счетчики, индекс и картинки
+        """
+        self.import_data("--batch-size", "2")
+        self.assertImported()
+        post = Post.objects.get(pk=self.post_id)
+        self.assertEqual(post.pub_date, PUB_DATE)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Group.objects.get().posts_count, 5)
+        response = self.client.get(reverse("posts:search"), {"q": "лес"})
+        self.assertEqual(response.context["page_obj"].paginator.count, 5)
+        self.assertTrue(
+            os.path.isfile(os.path.join(TARGET_MEDIA_ROOT, post.image.name))
+        )
+        self.assertIsNotNone(thumbnails.picture(post.image))
+
+    def test_image_outside_media_root(self):
+        """
+        Картинка с путем за пределы каталога считается ненайденной
+        """
+        for name in ("../dump.ndjson.gz", "/etc/passwd"):
+            with self.subTest(name=name):
+                self.assertFalse(transfer.copy_image(SOURCE_MEDIA_ROOT, name))
+
+    def test_non_empty_target_refused(self):
+        """
+        В базу с данными импорт без --resume не идет: pk дампа заняты
+        """
+        User.objects.create_user(username="target_admin")
+        with self.assertRaisesMessage(CommandError, "auth.user"):
+            self.import_data()
+        self.assertFalse(Post.objects.exists())
+
+    def test_conflicts_reported(self):
+        """
+        Записи, которые уже есть в базе, не считаются загруженными
+        """
+        self.import_data()
+        out, err = StringIO(), StringIO()
+        call_command("import_data", DUMP, "--resume", stdout=out, stderr=err)
+        self.assertIn("auth.user: 0 ", out.getvalue())
+        self.assertIn("Загружено записей: 0", out.getvalue())
+        self.assertIn(
+            "posts.post: пропущено записей, уже бывших в базе: 5",
+            err.getvalue(),
+        )
+        self.assertImported()
+
+    def test_resume_after_interruption(self):
+        """
+        Прерванный импорт продолжается с последней сохраненной пачки
+        """
+        write_batch = transfer.write_batch
+        calls = []
+
+        def interrupted(label, records):
+            calls.append(label)
+            if len(calls) == 3:
+                raise OSError("Импорт прерван")
+            return write_batch(label, records)
+
+        with mock.patch.object(transfer, "write_batch", interrupted):
+            with self.assertRaises(CommandError):
+                self.import_data("--batch-size", "1")
+        self.assertEqual(User.objects.count(), 2)
+        self.assertFalse(Group.objects.exists())
+
+        with mock.patch.object(transfer, "write_batch") as patched:
+            patched.side_effect = write_batch
+            self.import_data("--batch-size", "1", "--resume")
+        # Пользователи из первых двух пачек повторно не загружались.
+        self.assertEqual(patched.call_args_list[0][0][0], "posts.group")
+        self.assertImported()
+        self.assertFalse(os.path.exists(f"{DUMP}.checkpoint"))
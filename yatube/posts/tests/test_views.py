@@ -8,7 +8,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db import IntegrityError
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from posts.models import Follow, Group, Post, User
+from core import stats
+from posts.caching import GLOBAL_SCOPE, LOCK_PREFIX, bump_versions, make_key
+from posts.models import Comment, Follow, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -193,29 +195,318 @@ class PostCacheTest(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username="user")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test",
+            description="Тестовое описание",
+        )
         cls.post = Post.objects.create(
             text="Тестовый пост",
             author=cls.user,
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": cls.group.slug}),
+            reverse("posts:profile", kwargs={"username": cls.user.username}),
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_index_cache(self):
         """
         Тестирование кэша
         """
-        posts_count = Post.objects.count()
         response = self.guest_client.get(reverse("posts:index"))
         cached_content = response.content
-        self.post.delete()
-        self.assertEqual(Post.objects.count(), posts_count - 1)
+        Post.objects.filter(pk=self.post.pk).update(text="Новый текст")
         response = self.guest_client.get(reverse("posts:index"))
-        self.assertIn(cached_content, response.content)
+        self.assertEqual(cached_content, response.content)
         cache.clear()
         response = self.guest_client.get(reverse("posts:index"))
         self.assertNotEqual(cached_content, response.content)
 
+    def test_cache_invalidation(self):
+        """
+        Изменение поста сразу сбрасывает кэш лент, в которых он выводится
+        """
+        for url in self.urls:
+            self.guest_client.get(url)
+        post = Post.objects.create(
+            text="Свежий пост", author=self.user, group=self.group
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, post.text)
+        post.delete()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotContains(response, post.text)
+
+    def test_group_change_invalidation(self):
+        """
+        Смена адреса и названия группы сбрасывает ее прежнюю страницу и
+        страницы ее постов
+        """
+        old_url = self.urls[1]
+        post_url = reverse("posts:post_detail", args=(self.post.pk,))
+        for url in (old_url, post_url):
+            self.guest_client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = "renamed"
+        group.title = "Новое название"
+        group.save()
+        self.assertEqual(self.guest_client.get(old_url).status_code, 404)
+        self.assertContains(self.guest_client.get(post_url), group.title)
+
+    def test_stale_page_while_rebuilding(self):
+        """
+        Пока страницу пересобирает другой запрос, отдается прежняя копия
+        """
+        url = reverse("posts:index")
+        cached_content = self.guest_client.get(url).content
+        bump_versions(GLOBAL_SCOPE)
+        cache.add(make_key(LOCK_PREFIX, url), 1)
+        response = self.guest_client.get(url)
+        self.assertEqual(response.content, cached_content)
+        # Рисуются только персональные фрагменты, не сама лента.
+        self.assertNotIn("page_obj", response.context)
+        # Прежняя копия не должна запомниться клиентом под новым ETag.
+        self.assertFalse(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_shared_page_personal_fragments(self):
+        """
+        Общая копия страницы получает шапку и кнопки своего пользователя
+        """
+        reader = User.objects.create_user(username="reader")
+        Follow.objects.create(user=reader, author=self.user)
+        author_client = Client()
+        author_client.force_login(self.user)
+        reader_client = Client()
+        reader_client.force_login(reader)
+        profile = reverse("posts:profile", args=(self.user.username,))
+        detail = reverse("posts:post_detail", args=(self.post.pk,))
+        for url in (profile, detail, reverse("posts:index")):
+            self.guest_client.get(url)
+        follow_tab = reverse("posts:follow_index")
+        pages = (
+            (author_client, profile, "Пользователь:\n  user\n", "Подписаться"),
+            (reader_client, profile, "Пользователь:\n  reader", "Отписаться"),
+            (author_client, detail, "редактировать запись", "csrfmiddleware"),
+            (reader_client, reverse("posts:index"), follow_tab, "reader"),
+        )
+        for client, url, *fragments in pages:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertNotIn("page_obj", response.context or [])
+                for fragment in fragments:
+                    self.assertContains(response, fragment)
+                self.assertNotContains(response, "<!--hole:")
+        response = reader_client.get(detail)
+        self.assertNotContains(response, "редактировать запись")
+        response = self.guest_client.get(detail)
+        self.assertContains(response, "Войти")
+        self.assertNotContains(response, "csrfmiddleware")
+
+    @override_settings(FEED_CACHE_SHARED=False)
+    def test_per_user_pages(self):
+        """
+        Без общего кэша у каждого пользователя своя копия страницы
+        """
+        client = Client()
+        client.force_login(self.user)
+        url = reverse("posts:index")
+        self.guest_client.get(url)
+        response = client.get(url)
+        self.assertIn("page_obj", response.context)
+        self.assertContains(response, "Выйти")
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test",
+            description="Тестовое описание",
+        )
+        cls.post = Post.objects.create(
+            text="Тестовый пост",
+            author=cls.user,
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": cls.group.slug}),
+            reverse("posts:profile", kwargs={"username": cls.user.username}),
+            reverse("posts:post_detail", kwargs={"post_id": cls.post.pk}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_not_modified(self):
+        """
+        Повторный запрос с If-None-Match получает 304 без запросов к базе
+        """
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)["ETag"]
+                # Страница поста сначала читает сам пост.
+                detail = url == self.urls[-1]
+                with self.assertNumQueries(1 if detail else 0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+
+    def test_modified_after_change(self):
+        """
+        Изменение содержимого страницы меняет ETag
+        """
+        etags = [self.guest_client.get(url)["ETag"] for url in self.urls]
+        Post.objects.create(
+            text="Свежий пост", author=self.user, group=self.group
+        )
+        Comment.objects.create(post=self.post, author=self.user, text="Ого")
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_last_modified_for_guests(self):
+        """
+        Гости получают Last-Modified, вошедшие пользователи — только ETag
+        """
+        url = reverse("posts:index")
+        response = self.guest_client.get(url)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        response = authorized_client.get(url)
+        self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_etag_depends_on_user(self):
+        """
+        Страница гостя не подходит вошедшему пользователю
+        """
+        url = reverse("posts:index")
+        etag = self.guest_client.get(url)["ETag"]
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        response = authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user")
+        Post.objects.bulk_create(
+            Post(text=f"Тестовый пост {i}", author=cls.user) for i in range(3)
+        )
+        cls.url = reverse("posts:index")
+
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+
+    def test_cards_reused_after_feed_change(self):
+        """
+        После сброса ленты неизмененные карточки берутся из кэша
+        """
+        self.client.get(self.url)
+        self.assertEqual(stats.snapshot()["fragment.post_card.miss"], 3)
+        post = Post.objects.create(text="Новый пост", author=self.user)
+        response = self.client.get(self.url)
+        self.assertContains(response, post.text)
+        counters = stats.snapshot()
+        self.assertEqual(counters["fragment.post_card.miss"], 4)
+        self.assertEqual(counters["fragment.post_card.hit"], 3)
+
+    def test_edited_card_rendered_again(self):
+        """
+        Изменение поста сбрасывает только его карточку
+        """
+        self.client.get(self.url)
+        post = Post.objects.first()
+        post.text = "Измененный пост"
+        post.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, "Измененный пост")
+        counters = stats.snapshot()
+        self.assertEqual(counters["fragment.post_card.miss"], 4)
+        self.assertEqual(counters["fragment.post_card.hit"], 2)
+
+    def test_card_depends_on_page(self):
+        """
+        Карточки с автором и без него кэшируются отдельно
+        """
+        self.client.get(self.url)
+        response = self.client.get(
+            reverse("posts:profile", kwargs={"username": "user"})
+        )
+        self.assertNotContains(response, "Автор:")
+        self.assertEqual(stats.snapshot()["fragment.post_card.miss"], 6)
+
+
+@override_settings(COMMENTS_PAGE_LIMIT=5)
+class PostDetailQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test",
+            description="Тестовое описание",
+        )
+        cls.post = Post.objects.create(
+            text="Тестовый пост", author=cls.author, group=cls.group
+        )
+        commentators = [
+            User.objects.create_user(username=f"user{i}") for i in range(7)
+        ]
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=user, text=f"Комментарий {i}")
+            for i, user in enumerate(commentators)
+        )
+        cls.url = reverse("posts:post_detail", kwargs={"post_id": cls.post.id})
+
+    def test_detail_queries(self):
+        """
+        Пост, автор, группа и страница комментариев загружаются
+        фиксированным числом запросов
+        """
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), 5)
+        self.assertContains(response, "user4")
+        self.assertNotContains(response, "user5")
+
+    def test_detail_comments_second_page(self):
+        """
+        Остальные комментарии выводятся на следующей странице
+        """
+        response = self.client.get(self.url + "?page=2")
+        self.assertEqual(len(response.context["comments"]), 2)
+        self.assertContains(response, "user6")
+
 
 class PostFollowTest(TestCase):
     @classmethod
@@ -258,6 +549,27 @@ class PostFollowTest(TestCase):
             True,
         )
 
+    def test_follower_profile_changed(self):
+        """
+        После подписки профиль подписчика показывает новое число подписок
+        """
+        cache.clear()
+        url = reverse("posts:profile", kwargs={"username": self.user.username})
+        # Первый ответ выдает cookie CSRF, от которой зависит ETag.
+        self.authorized_client.get(url)
+        etag = self.authorized_client.get(url)["ETag"]
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.authorized_client.post(
+            reverse(
+                "posts:profile_follow",
+                kwargs={"username": self.author.username},
+            )
+        )
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response.content.decode(), r"подписок:\s+1<")
+
     def test_unfollow_as_user(self):
         """
         Пользователь может отписываться от других пользователей
@@ -0,0 +1,236 @@
+import hashlib
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections, transaction
+from PIL import Image
+from posts.models import Post
+from sorl.thumbnail import base, default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from .caching import bump_versions, post_scopes
+
+logger = logging.getLogger(__name__)
+
+VARIANT_OPTIONS = {"crop": "center", "upscale": True}
+MIME_TYPES = {
+    "GIF": "image/gif",
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+}
+
+_executor = None
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    """
+    Бэкенд sorl с предсказуемыми именами вариантов картинок постов.
+
+    Варианты лежат в POST_IMAGE_VARIANTS_DIR под именами
+    <оригинал>_<хэш>_<геометрия>.<расширение>, где хэш — от полного имени
+    оригинала: у photo.jpg и photo.png разные варианты. Бэкенд умеет
+    находить готовый вариант без его создания и создавать несколько
+    вариантов за одно чтение оригинала.
+    """
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        stem = posixpath.splitext(posixpath.basename(source.name))[0]
+        digest = hashlib.md5(source.name.encode()).hexdigest()[:8]
+        extension = base.EXTENSIONS[options["format"]]
+        return posixpath.join(
+            settings.POST_IMAGE_VARIANTS_DIR,
+            f"{stem}_{digest}_{geometry_string}.{extension}",
+        )
+
+    def _with_defaults(self, source, options):
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault("format", self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def lookup(self, file_, geometry_string, **options):
+        """Возвращает миниатюру из хранилища ключей sorl или None."""
+        source = ImageFile(file_)
+        options = self._with_defaults(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+    def create_variants(self, file_, variants):
+        """Создает миниатюры [(геометрия, параметры), ...] оригинала file_."""
+        source = ImageFile(file_)
+        source_image = default.engine.get_image(source)
+        try:
+            source.set_size(default.engine.get_image_size(source_image))
+            image_info = default.engine.get_image_info(source_image)
+            default.kvstore.get_or_set(source)
+            for geometry_string, options in variants:
+                options = self._with_defaults(source, dict(options))
+                thumbnail = ImageFile(
+                    self._get_thumbnail_filename(
+                        source, geometry_string, options
+                    ),
+                    default.storage,
+                )
+                options["image_info"] = image_info
+                self._create_thumbnail(
+                    source_image, geometry_string, options, thumbnail
+                )
+                default.kvstore.set(thumbnail, source)
+        finally:
+            default.engine.cleanup(source_image)
+
+
+def _geometries():
+    width, height = settings.POST_IMAGE_SIZE
+    widths = sorted(set(settings.POST_IMAGE_WIDTHS) | {width})
+    return [(w, f"{w}x{round(w * height / width)}") for w in widths]
+
+
+def _formats(image):
+    """Форматы вариантов: сначала POST_IMAGE_FORMATS, последним оригинал."""
+    Image.init()
+    source_format = default.backend._get_format(ImageFile(image))
+    # Без нужных библиотек Pillow не умеет сохранять, например, WebP.
+    formats = [
+        image_format
+        for image_format in settings.POST_IMAGE_FORMATS
+        if image_format != source_format and image_format in Image.SAVE
+    ]
+    return formats + [source_format]
+
+
+def picture(image):
+    """
+    Готовые варианты картинки для разметки <picture>.
+
+    Возвращает словарь с ключами sources (type и srcset для <source>), src
+    и srcset для <img> или None, пока нет варианта оригинального формата
+    шириной POST_IMAGE_SIZE.
+    """
+    if not image:
+        return None
+    *formats, source_format = _formats(image)
+    geometries = _geometries()
+
+    def srcset(image_format):
+        found = []
+        for width, geometry in geometries:
+            thumbnail = default.backend.lookup(
+                image, geometry, format=image_format, **VARIANT_OPTIONS
+            )
+            if thumbnail is not None:
+                found.append((width, thumbnail))
+        return found
+
+    fallback = dict(srcset(source_format))
+    src = fallback.get(settings.POST_IMAGE_SIZE[0])
+    if src is None:
+        return None
+    sources = []
+    for image_format in formats:
+        found = srcset(image_format)
+        if found:
+            sources.append(
+                {
+                    "type": MIME_TYPES[image_format],
+                    "srcset": _srcset(found),
+                }
+            )
+    return {
+        "sources": sources,
+        "src": src.url,
+        "srcset": _srcset(fallback.items()),
+    }
+
+
+def _srcset(found):
+    return ", ".join(f"{thumbnail.url} {width}w" for width, thumbnail in found)
+
+
+def generate(post_id):
+    """Создает все варианты картинки поста и сбрасывает его страницы."""
+    post = (
+        Post.objects.select_related("author", "group")
+        .filter(pk=post_id)
+        .first()
+    )
+    if post is None or not post.image:
+        return
+    default.backend.create_variants(
+        post.image,
+        [
+            (geometry, dict(VARIANT_OPTIONS, format=image_format))
+            for image_format in _formats(post.image)
+            for _, geometry in _geometries()
+        ],
+    )
+    # Страницы с заглушкой вместо картинки больше не нужны.
+    bump_versions(*post_scopes(post))
+
+
+def _run(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception("Не удалось создать миниатюры поста %s", post_id)
+    finally:
+        connections.close_all()
+
+
+def generate_missing(executor, batch_size):
+    """
+    Создает в потоках executor недостающие варианты картинок постов,
+    возвращает число картинок, для которых они создавались.
+    """
+    # Id читаются списками: открытый курсор SQLite мешал бы потокам,
+    # которые записывают миниатюры. Посты без картинки хранят пустую
+    # строку или NULL, поэтому нужен фильтр, а не exclude(image="").
+    generated = 0
+    posts = Post.objects.filter(image__gt="").only("pk", "image")
+    posts = posts.order_by("pk")
+    last_pk = 0
+    while True:
+        chunk = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            return generated
+        last_pk = chunk[-1].pk
+        # Варианты общей картинки достаточно создать для одного поста.
+        missing = {
+            post.image.name: post.pk
+            for post in chunk
+            if picture(post.image) is None
+        }
+        wait([executor.submit(_run, pk) for pk in missing.values()])
+        generated += len(missing)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def schedule(post_id):
+    """
+    Ставит создание миниатюр в очередь после фиксации транзакции.
+
+    При THUMBNAIL_ASYNC = False миниатюры создаются сразу в текущем потоке.
+    """
+    if not settings.THUMBNAIL_ASYNC:
+        transaction.on_commit(lambda: generate(post_id))
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run, post_id))
@@ -0,0 +1,75 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from posts.models import Follow, Post, TimelineEntry
+
+# Поля сортировки ленты: их обслуживает индекс timeline_user_pub_date.
+KEYSET = ("pub_date", "post_id")
+
+
+def feed(user):
+    """Записи ленты подписчика, от новых к старым."""
+    return (
+        TimelineEntry.objects.filter(user=user)
+        .select_related("post__author", "post__group")
+        .order_by("-pub_date", "-post_id")
+    )
+
+
+def _bulk_add(entries):
+    batch_size = settings.TIMELINE_BATCH_SIZE
+    entries = iter(entries)
+    batch = list(islice(entries, batch_size))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, batch_size))
+
+
+@transaction.atomic
+def add_post(post):
+    """Разносит новый пост по лентам подписчиков автора."""
+    follower_ids = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+        for user_id in follower_ids.iterator()
+    )
+
+
+@transaction.atomic
+def add_author(user_id, author_id):
+    """Добавляет в ленту подписчика все посты автора."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        "pk", "pub_date"
+    )
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+@transaction.atomic
+def rebuild(user_id):
+    """Собирает ленту подписчика заново по его подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(author__following__user_id=user_id)
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.values_list("pk", "pub_date").iterator()
+    )
+
+
+def rebuild_all():
+    """Собирает заново ленты всех подписчиков."""
+    followers = Follow.objects.values_list("user_id", flat=True)
+    for user_id in list(followers.order_by().distinct()):
+        rebuild(user_id)
@@ -0,0 +1,326 @@
+"""
+Перенос данных между экземплярами в формате NDJSON.
+
+Каждая строка дампа — одна запись в формате сериализатора Django:
+{"model": "posts.post", "pk": 1, "fields": {...}}. Модели идут в порядке
+зависимостей, внутри модели — по возрастанию pk.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils._os import safe_join
+from posts.models import Comment, Follow, Group, Post, User
+
+from . import counters, ranking, recommendations, search, thumbnails, timeline
+
+MODELS = {
+    "auth.user": (
+        User,
+        (
+            "username",
+            "password",
+            "first_name",
+            "last_name",
+            "email",
+            "is_active",
+            "is_staff",
+            "is_superuser",
+            "date_joined",
+            "last_login",
+        ),
+    ),
+    "posts.group": (Group, ("title", "slug", "description")),
+    "posts.post": (
+        Post,
+        ("text", "pub_date", "created", "author", "group", "image", "views"),
+    ),
+    "posts.comment": (Comment, ("post", "author", "text", "created")),
+    "posts.follow": (Follow, ("user", "author", "created")),
+}
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def open_dump(path, mode):
+    """Открывает дамп, сжатый gzip, если имя оканчивается на .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def export(stream):
+    """
+    Пишет все записи в текстовый поток stream.
+
+    Записи читаются итератором по EXPORT_CHUNK_SIZE строк, поэтому память
+    не зависит от объема базы. Возвращает {модель: число записей}.
+    """
+    exported = {}
+    for label, (model, names) in MODELS.items():
+        fields = [model._meta.get_field(name) for name in names]
+        rows = (
+            model.objects.order_by("pk")
+            .values_list("pk", *(field.attname for field in fields))
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        exported[label] = 0
+        for pk, *values in rows:
+            record = {
+                "model": label,
+                "pk": pk,
+                "fields": dict(zip(names, values)),
+            }
+            stream.write(json.dumps(record, cls=DjangoJSONEncoder) + "\n")
+            exported[label] += 1
+    return exported
+
+
+def read_batches(stream, batch_size, offset=0):
+    """
+    Пачки записей одной модели из бинарного потока, начиная с offset.
+
+    Выдает (модель, записи, смещение сразу после последней записи).
+    """
+    stream.seek(offset)
+    label, batch, end = None, [], offset
+    for line in stream:
+        offset += len(line)
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if batch and (record["model"] != label or len(batch) >= batch_size):
+            yield label, batch, end
+            batch = []
+        label = record["model"]
+        batch.append(record)
+        end = offset
+    if batch:
+        yield label, batch, end
+
+
+def _build(model, record):
+    obj = model(pk=record["pk"])
+    for name, value in record["fields"].items():
+        field = model._meta.get_field(name)
+        setattr(obj, field.attname, field.to_python(value))
+    return obj
+
+
+def _model(label):
+    if label not in MODELS:
+        raise ValueError(f"Неизвестная модель в дампе: {label}")
+    return MODELS[label][0]
+
+
+def bulk_create_dated(model, objs):
+    """
+    bulk_create, сохраняющий заданные значения полей auto_now_add.
+
+    У всех объектов должен быть задан pk. Записи, которые конфликтуют с
+    уже существующими (по pk или уникальным полям), пропускаются.
+    Возвращает число вставленных записей.
+    """
+    # Как и loaddata, raw-вставка берет значения полей из объектов как
+    # есть: bulk_create записал бы в поля auto_now_add текущее время.
+    if not objs:
+        return 0
+    fields = model._meta.concrete_fields
+    batch_size = max(connection.ops.bulk_batch_size(fields, objs), 1)
+    pks = [obj.pk for obj in objs]
+    # Пропущенные вставки видны только по числу строк в диапазоне pk.
+    in_range = model._base_manager.filter(pk__gte=min(pks), pk__lte=max(pks))
+    with transaction.atomic():
+        before = in_range.count()
+        for start in range(0, len(objs), batch_size):
+            stop = start + batch_size
+            model._base_manager._insert(
+                objs[start:stop],
+                fields,
+                raw=True,
+                ignore_conflicts=True,
+            )
+        return in_range.count() - before
+
+
+def write_batch(label, records):
+    """
+    Сохраняет пачку записей одной транзакцией.
+
+    Повторный импорт той же пачки безопасен: записи, которые уже есть в
+    базе, пропускаются. Возвращает объекты пачки и число вставленных.
+    """
+    model = _model(label)
+    objs = [_build(model, record) for record in records]
+    return objs, bulk_create_dated(model, objs)
+
+
+def check_empty():
+    """
+    Отказывает в импорте в базу с данными: записи дампа с занятыми pk
+    пропускались бы, а их посты и комментарии достались бы чужим
+    записям с теми же pk.
+    """
+    filled = [
+        label for label, (model, _) in MODELS.items() if model.objects.exists()
+    ]
+    if filled:
+        raise ValueError(
+            "Импорт возможен только в пустую базу, уже есть записи: "
+            + ", ".join(filled)
+            + ". Прерванный импорт продолжает --resume."
+        )
+
+
+def copy_image(media_root, name):
+    """
+    Копирует картинку name из media_root в хранилище.
+
+    Возвращает False, если исходного файла нет или имя ведет за пределы
+    media_root или хранилища.
+    """
+    try:
+        if default_storage.exists(name):
+            return True
+        source = safe_join(media_root, name)
+    except SuspiciousFileOperation:
+        return False
+    if not os.path.isfile(source):
+        return False
+    with open(source, "rb") as file:
+        default_storage.save(name, File(file))
+    return True
+
+
+def reset_sequences():
+    """Сдвигает счетчики pk за импортированные записи (нужно не SQLite)."""
+    models = [model for model, _ in MODELS.values()]
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild_derived(executor, batch_size, with_thumbnails=True):
+    """
+    Восстанавливает производные данные, которые обычно ведут сигналы.
+
+    bulk_create не отправляет сигналы, поэтому после массовой загрузки
+    счетчики, ленты подписок, поисковый индекс, рейтинг популярных,
+    рекомендации авторов, миниатюры и кэш страниц пересобираются целиком.
+    """
+    reset_sequences()
+    counters.reconcile()
+    if settings.FOLLOW_TIMELINE:
+        timeline.rebuild_all()
+    search.rebuild()
+    ranking.refresh(batch_size, full=True)
+    recommendations.refresh(batch_size)
+    if with_thumbnails:
+        thumbnails.generate_missing(executor, batch_size)
+    cache.clear()
+
+
+class Importer:
+    """
+    Импорт дампа пачками по batch_size записей.
+
+    После каждой пачки в файл checkpoint пишется смещение следующей
+    записи; с resume=True импорт продолжается с него. Картинки постов
+    копируются из media_root параллельно в workers потоков, пачка
+    считается завершенной, когда скопированы и ее картинки.
+    """
+
+    def __init__(
+        self,
+        path,
+        batch_size=1000,
+        media_root=None,
+        workers=4,
+        resume=False,
+        report=None,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.media_root = media_root
+        self.workers = workers
+        self.resume = resume
+        self.report = report
+        self.checkpoint = f"{path}.checkpoint"
+        # Вставленные записи, пропущенные из-за конфликтов и секунды по
+        # моделям за этот запуск.
+        self.rows = {}
+        self.conflicts = {}
+        self.seconds = {}
+        self.missing_images = 0
+
+    def _load_checkpoint(self):
+        if not self.resume or not os.path.exists(self.checkpoint):
+            return 0
+        with open(self.checkpoint) as file:
+            return json.load(file)["offset"]
+
+    def _save_checkpoint(self, offset):
+        temporary = f"{self.checkpoint}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({"offset": offset}, file)
+        os.replace(temporary, self.checkpoint)
+
+    def _copy_images(self, executor, objs):
+        if self.media_root is None:
+            return
+        futures = {
+            executor.submit(
+                copy_image, self.media_root, obj.image.name
+            ): obj.image.name
+            for obj in objs
+            if getattr(obj, "image", None)
+        }
+        wait(futures)
+        for future, name in futures.items():
+            if not future.result():
+                self.missing_images += 1
+                logger.warning("Нет картинки %s в %s", name, self.media_root)
+
+    def run(self, with_thumbnails=True):
+        """Импортирует дамп и возвращает общее время в секундах."""
+        started = time.perf_counter()
+        if not self.resume:
+            check_empty()
+        offset = self._load_checkpoint()
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="import"
+        ) as executor, open_dump(self.path, "rb") as stream:
+            for label, records, end in read_batches(
+                stream, self.batch_size, offset
+            ):
+                batch_started = time.perf_counter()
+                objs, inserted = write_batch(label, records)
+                self._copy_images(executor, objs)
+                self._save_checkpoint(end)
+                seconds = time.perf_counter() - batch_started
+                self.rows[label] = self.rows.get(label, 0) + inserted
+                conflicts = len(objs) - inserted
+                self.conflicts[label] = (
+                    self.conflicts.get(label, 0) + conflicts
+                )
+                self.seconds[label] = self.seconds.get(label, 0) + seconds
+                if self.report is not None:
+                    self.report(label, inserted, seconds)
+            rebuild_derived(executor, self.batch_size, with_thumbnails)
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        return time.perf_counter() - started
@@ -6,6 +6,7 @@ app_name = "posts"
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("popular/", views.popular, name="popular"),
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
     path("profile/<str:username>/", views.profile, name="profile"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
@@ -14,6 +15,7 @@ urlpatterns = [
     path(
         "posts/<int:post_id>/comment/", views.add_comment, name="add_comment"
     ),
+    path("search/", views.search, name="search"),
     path("follow/", views.follow_index, name="follow_index"),
     path(
         "profile/<str:username>/follow/",
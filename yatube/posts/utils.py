@@ -1,8 +1,161 @@
+import collections.abc
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+CURSOR_NEXT = "n"
+CURSOR_PREVIOUS = "p"
+
+
+def page_window(number, num_pages, radius):
+    """
+    Номера страниц для навигации: первая, последняя и radius страниц по
+    обе стороны от текущей number. None стоит на месте пропуска.
+    """
+    start = max(1, number - radius)
+    stop = min(num_pages, number + radius)
+    # Пропуск из одной страницы короче показать номером.
+    if start <= 3:
+        start, head = 1, []
+    else:
+        head = [1, None]
+    if stop >= num_pages - 2:
+        stop, tail = num_pages, []
+    else:
+        tail = [None, num_pages]
+    return head + list(range(start, stop + 1)) + tail
 
 
-def paginate_page(request, qs):
+def get_page(paginator, number):
+    """
+    paginator.get_page с окном номеров page.window для шаблона
+    paginator.html: число ссылок не зависит от числа страниц.
+    """
+    page = paginator.get_page(number)
+    page.window = page_window(
+        page.number, paginator.num_pages, settings.PAGE_WINDOW_RADIUS
+    )
+    return page
+
+
+def paginate_page(request, qs, keyset=("pub_date", "pk")):
+    """
+    Страница qs по номеру или по курсору; без keyset (лента не
+    по дате) — только по номеру.
+    """
+    cursor = settings.PAGINATION_MODE == "cursor" or "cursor" in request.GET
+    if keyset and cursor:
+        return paginate_cursor(request, qs, keyset)
     page_num = request.GET.get("page")
     paginator_obj = Paginator(qs, settings.PAGE_LIMIT)
-    return paginator_obj.get_page(page_num)
+    return get_page(paginator_obj, page_num)
+
+
+def paginate_comments(request, post):
+    comments = post.comments.select_related("author").order_by("created", "pk")
+    paginator_obj = Paginator(comments, settings.COMMENTS_PAGE_LIMIT)
+    return get_page(paginator_obj, request.GET.get("page"))
+
+
+def encode_cursor(direction, pub_date, pk):
+    value = f"{direction}|{pub_date.isoformat()}|{pk}"
+    return urlsafe_base64_encode(force_bytes(value))
+
+
+def decode_cursor(token):
+    """
+    Возвращает (направление, дата публикации, id) или None,
+    если курсор пустой или поврежден.
+    """
+    try:
+        direction, pub_date, pk = force_str(
+            urlsafe_base64_decode(token)
+        ).split("|")
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(collections.abc.Sequence):
+    """
+    Страница ленты, выбранная по ключу (pub_date, id) без OFFSET и COUNT.
+    """
+
+    cursor_mode = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self.object_list)}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginate_cursor(request, qs, keyset=("pub_date", "pk")):
+    """
+    keyset — поля даты и id, по которым отсортирована лента, например
+    ("pub_date", "post_id") для записей персональной ленты.
+    """
+    date_field, id_field = keyset
+    limit = settings.PAGE_LIMIT
+    position = decode_cursor(request.GET.get("cursor", ""))
+    qs = qs.order_by(f"-{date_field}", f"-{id_field}")
+    if position is None:
+        rows = list(qs[: limit + 1])
+        has_next, has_previous = len(rows) > limit, False
+        rows = rows[:limit]
+    elif position[0] == CURSOR_NEXT:
+        _, pub_date, pk = position
+        rows = list(
+            qs.filter(
+                Q(**{f"{date_field}__lt": pub_date})
+                | Q(**{date_field: pub_date, f"{id_field}__lt": pk})
+            )[: limit + 1]
+        )
+        has_next, has_previous = len(rows) > limit, True
+        rows = rows[:limit]
+    else:
+        _, pub_date, pk = position
+        rows = list(
+            qs.filter(
+                Q(**{f"{date_field}__gt": pub_date})
+                | Q(**{date_field: pub_date, f"{id_field}__gt": pk})
+            ).order_by(date_field, id_field)[: limit + 1]
+        )
+        has_next, has_previous = True, len(rows) > limit
+        rows = rows[:limit][::-1]
+
+    def cursor(direction, row):
+        return encode_cursor(
+            direction, getattr(row, date_field), getattr(row, id_field)
+        )
+
+    return CursorPage(
+        rows,
+        cursor(CURSOR_NEXT, rows[-1]) if has_next and rows else None,
+        cursor(CURSOR_PREVIOUS, rows[0]) if has_previous and rows else None,
+    )
@@ -1,13 +1,33 @@
+from core.replicas import replica_reads
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 from posts.models import Follow, Group, Post, User
 
+from . import hits, ranking, timeline
+from .caching import (
+    GLOBAL_SCOPE,
+    POPULAR_SCOPE,
+    SUGGESTIONS_SCOPE,
+    author_scope,
+    cache_feed,
+    cached_page,
+    conditional_feed,
+    conditional_response,
+    group_scope,
+    post_scope,
+    request_versions,
+    suggestions_scope,
+)
 from .forms import CommentForm, PostForm
-from .utils import paginate_page
+from .search import paginate_results
+from .utils import paginate_comments, paginate_page
 
 
-@cache_page(20, key_prefix="index_page")
+@replica_reads
+@conditional_feed(lambda: [GLOBAL_SCOPE])
+@cache_feed(lambda: [GLOBAL_SCOPE])
 def index(request):
     template = "posts/index.html"
     posts = Post.objects.select_related("group", "author")
@@ -18,6 +38,23 @@ def index(request):
     return render(request, template, context)
 
 
+@replica_reads
+@conditional_feed(lambda: [GLOBAL_SCOPE, POPULAR_SCOPE])
+@cache_feed(lambda: [GLOBAL_SCOPE, POPULAR_SCOPE])
+def popular(request):
+    template = "posts/popular.html"
+    # Страницы по индексу post_rank_score, как хронологическая лента.
+    page_obj = paginate_page(request, ranking.feed(), keyset=None)
+    page_obj.object_list = [rank.post for rank in page_obj]
+    context = {
+        "page_obj": page_obj,
+    }
+    return render(request, template, context)
+
+
+@replica_reads
+@conditional_feed(lambda slug: [group_scope(slug)])
+@cache_feed(lambda slug: [group_scope(slug)])
 def group_posts(request, slug):
     template = "posts/group_list.html"
     group = get_object_or_404(Group, slug=slug)
@@ -30,29 +67,63 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@replica_reads
+# Рекомендации авторов (who_to_follow) видны только авторизованным и
+# меняются пересчетом и подписками самого пользователя.
+@conditional_feed(
+    lambda username: [author_scope(username)],
+    personal=lambda user: [SUGGESTIONS_SCOPE, suggestions_scope(user.pk)],
+)
+@cache_feed(lambda username: [author_scope(username)])
 def profile(request, username):
     template = "posts/profile.html"
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related("counters"), username=username
+    )
     posts = author.posts.select_related("group")
     page_obj = paginate_page(request, posts)
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(user=request.user, author=author).exists()
-    )
-    context = {"author": author, "page_obj": page_obj, "following": following}
+    # Кнопка подписки — персональный фрагмент follow_button (posts.holes).
+    context = {"author": author, "page_obj": page_obj}
     return render(request, template, context)
 
 
+@replica_reads
 def post_detail(request, post_id):
     template = "posts/post_detail.html"
-    post = get_object_or_404(Post, id=post_id)
-    form = CommentForm()
-    comments = post.comments.all()
+    # Версия поста читается до него самого: с реплики пост должен прийти
+    # не старше ETag страницы.
+    request_versions(request, [post_scope(post_id)])
+    post = get_object_or_404(
+        Post.objects.select_related("author__counters", "group"), id=post_id
+    )
+    hits.record(post.pk)
+
+    def render_page():
+        form = CommentForm()
+        comments = paginate_comments(request, post)
+        context = {
+            "post": post,
+            "author": post.author,
+            "form": form,
+            "comments": comments,
+        }
+        return render(request, template, context)
+
+    # Счетчики автора на странице меняются вместе с его профилем.
+    scopes = [post_scope(post.pk), author_scope(post.author.username)]
+    return conditional_response(
+        request, scopes, lambda: cached_page(request, scopes, render_page)
+    )
+
+
+def search(request):
+    template = "posts/search.html"
+    query = request.GET.get("q", "").strip()
+    page_obj = paginate_results(request, query)
     context = {
-        "post": post,
-        "author": post.author,
-        "form": form,
-        "comments": comments,
+        "query": query,
+        "page_obj": page_obj,
+        "page_query": urlencode({"q": query}) + "&",
     }
     return render(request, template, context)
 
@@ -107,12 +178,19 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
     template = "posts/follow.html"
-    posts = Post.objects.select_related("author").filter(
-        author__following__user=request.user
-    )
-    page_obj = paginate_page(request, posts)
+    if settings.FOLLOW_TIMELINE:
+        page_obj = paginate_page(
+            request, timeline.feed(request.user), keyset=timeline.KEYSET
+        )
+        page_obj.object_list = [entry.post for entry in page_obj]
+    else:
+        posts = Post.objects.select_related("author", "group").filter(
+            author__following__user=request.user
+        )
+        page_obj = paginate_page(request, posts)
     context = {"page_obj": page_obj}
     return render(request, template, context)
 
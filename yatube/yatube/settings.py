@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -55,26 +56,46 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.StickyPrimaryMiddleware",
 ]
 
 ROOT_URLCONF = "yatube.urls"
 
+# Доля запросов, которые замеряет core.middleware.ProfilingMiddleware
+# (0 — выключено, 1 — все запросы). Замеры видны на /admin/profiling/.
+PROFILING_SAMPLE_RATE = 0
+PROFILING_BUFFER_SIZE = 500
+
 # Путь к директории с шаблонами вынесен в переменную:
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+# Кэширующий загрузчик держит разобранные шаблоны в памяти процесса и не
+# замечает правок файлов: по умолчанию он включен только без DEBUG.
+# При старте wsgi.py компилирует все шаблоны (precompile_templates).
+CACHED_TEMPLATES = os.getenv(
+    "YATUBE_CACHED_TEMPLATES", "0" if DEBUG else "1"
+) in ("1", "true", "True")
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if CACHED_TEMPLATES:
+    TEMPLATE_LOADERS = [
+        ("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)
+    ]
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         # Добавлено: Искать шаблоны на уровне проекта
         "DIRS": [os.path.join(BASE_DIR, "templates")],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "core.context_processors.year.year",
-            ]
+            ],
         },
     }
 ]
@@ -85,12 +106,44 @@ WSGI_APPLICATION = "yatube.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединение живет CONN_MAX_AGE секунд и переиспользуется следующими
+# запросами потока; при каждом новом соединении с SQLite выполняются
+# PRAGMA из SQLITE_PRAGMAS (core.db).
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "CONN_MAX_AGE": int(os.getenv("YATUBE_CONN_MAX_AGE", "60")),
     }
 }
+# Реплики для чтения лент (core.replicas): пути к копиям базы через запятую
+# в YATUBE_REPLICAS. Локально копии обновляет manage.py sync_replicas.
+REPLICA_DATABASES = []
+for number, name in enumerate(
+    filter(None, os.getenv("YATUBE_REPLICAS", "").split(",")), 1
+):
+    alias = f"replica{number}"
+    # В тестах реплика — та же тестовая база.
+    DATABASES[alias] = dict(
+        DATABASES["default"], NAME=name, TEST={"MIRROR": "default"}
+    )
+    REPLICA_DATABASES.append(alias)
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+# Приложения, модели которых читаются с реплик; сессии и пользователи
+# запроса всегда читаются из основной базы.
+REPLICA_APPS = ("posts",)
+# Сколько секунд после записи клиент читает только основную базу.
+REPLICA_STICKY_SECONDS = 5
+# WAL: чтение не ждет записи, а запись — чтения. synchronous = normal в
+# режиме WAL не портит базу при сбое, но при отключении питания может
+# потерять последние транзакции. busy_timeout — сколько миллисекунд
+# запись ждет другую запись, прежде чем вернуть "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,
+}
 
 
 # Password validation
@@ -147,6 +200,17 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 PAGE_LIMIT = 10
+COMMENTS_PAGE_LIMIT = 50
+# Сколько номеров страниц показывать по обе стороны от текущей.
+PAGE_WINDOW_RADIUS = 3
+# "page" — нумерованные страницы, "cursor" — курсорная пагинация по
+# (pub_date, id); параметр ?cursor= включает курсоры и в режиме "page"
+PAGINATION_MODE = "page"
+
+# Лента подписок из заранее разнесенных записей (fan-out on write).
+# После включения заполнить ленты: python manage.py rebuild_timelines
+FOLLOW_TIMELINE = False
+TIMELINE_BATCH_SIZE = 1000
 
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
@@ -156,8 +220,70 @@ CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Поиск по постам (posts.search): "fts5" — виртуальная таблица SQLite FTS5,
+# если она есть, "table" — инвертированный индекс в модели SearchTerm.
+# После смены бэкенда: python manage.py rebuild_search_index
+SEARCH_BACKEND = "fts5"
+
+# Варианты картинок постов создаются после загрузки (posts.thumbnails):
+# кадр POST_IMAGE_SIZE в ширинах POST_IMAGE_WIDTHS, в формате оригинала
+# и в форматах POST_IMAGE_FORMATS, если Pillow умеет их сохранять.
+POST_IMAGE_SIZE = (960, 339)
+POST_IMAGE_WIDTHS = (320, 640, 960, 1920)
+POST_IMAGE_FORMATS = ("WEBP",)
+POST_IMAGE_VARIANTS_DIR = "posts/variants"
+THUMBNAIL_BACKEND = "posts.thumbnails.ThumbnailBackend"
+# Ключи sorl (в том числе промахи) читаются мимо кэша процесса: иначе
+# поток запроса до NEAR_TIMEOUT секунд не видит готовые фоновые миниатюры.
+THUMBNAIL_CACHE = "shared"
+# False — создавать миниатюры в запросе, без фоновых потоков.
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
+# Лента популярных (posts.ranking): веса комментариев, подписчиков автора и
+# просмотров и за сколько часов вовлеченность поста теряет половину веса.
+# Оценки обновляет python manage.py rank_posts; после смены весов — с --full.
+POPULAR_WEIGHTS = {"comments": 1.0, "followers": 0.1, "views": 0.05}
+POPULAR_HALF_LIFE = 24
+
+# Просмотры постов копятся в памяти процесса (posts.hits) и записываются
+# в Post.views не реже раза в HITS_FLUSH_INTERVAL секунд. Просмотры постов
+# сверх HITS_BUFFER_SIZE до сброса не учитываются.
+HITS_FLUSH_INTERVAL = 10
+HITS_BUFFER_SIZE = 10_000
+
+# Рекомендации авторов (posts.recommendations): сколько авторов хранить
+# для пользователя и сколько соседей вершины графа подписок смотреть на
+# каждом шаге. Пересчет — python manage.py recommend_authors.
+RECOMMEND_LIMIT = 5
+RECOMMEND_FANOUT = 30
+
+# Страницы лент кэшируются до изменения их содержимого (posts.caching),
+# срок жизни ограничивает только устаревание по времени.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько отдавать прежнюю копию, пока другой запрос пересобирает страницу.
+FEED_CACHE_STALE_TIMEOUT = 60
+FEED_CACHE_LOCK_TIMEOUT = 10
+# Одна копия страницы ленты на всех пользователей: персональные
+# фрагменты (шапка, кнопки подписки и правки, форма комментария)
+# подставляются при ответе (core.holes). False — копия на пользователя.
+FEED_CACHE_SHARED = True
+
+# default — кэш процесса (core.cache.TwoTierCache) перед общим кэшем
+# "shared". Для нескольких процессов общий кэш должен быть внешним, например
+# "django.core.cache.backends.filebased.FileBasedCache" с LOCATION
+# os.path.join(BASE_DIR, "cache") или memcached.
 CACHES = {
     "default": {
+        "BACKEND": "core.cache.TwoTierCache",
+        "LOCATION": "shared",
+        "OPTIONS": {
+            # Сколько секунд процесс может не сверяться с общим кэшем.
+            "NEAR_TIMEOUT": 5,
+            "NEAR_MAX_ENTRIES": 1000,
+        },
+    },
+    "shared": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    }
+    },
 }
@@ -1,3 +1,4 @@
+from core.views import profiling, stats
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
@@ -8,6 +9,8 @@ handler404 = "core.views.page_not_found"
 handler500 = "core.views.server_error"
 
 urlpatterns = [
+    path("admin/stats/", stats, name="stats"),
+    path("admin/profiling/", profiling, name="profiling"),
     path("admin/", admin.site.urls),
     path("about/", include("about.urls", namespace="about")),
     path("auth/", include("users.urls", namespace="users")),
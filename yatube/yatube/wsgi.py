@@ -7,10 +7,24 @@ For more information on this file, see
 https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 """
 
+import logging
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.CACHED_TEMPLATES:
+    # Первый запрос к странице не должен разбирать шаблоны.
+    from core.precompile import precompile
+
+    _, _, errors = precompile()
+    # Шаблон с ошибкой ломает только свои страницы, поэтому сервер
+    # стартует, но ошибки не должны теряться до первого запроса.
+    for name, error in errors.items():
+        logging.getLogger(__name__).error(
+            'Шаблон %s не компилируется: %s', name, error
+        )